@@ -1,9 +1,9 @@
-import os
+import asyncio
 
 from aiogram import Router, types, F
 from aiogram.filters import or_f
 from aiogram.fsm.context import FSMContext
-from django.core.files.images import ImageFile
+from django.conf import settings
 
 from bot.keyboards.inline import get_inline_keyboard, inline_driver_keyboard
 from bot.keyboards.reply import reply_keyboard_remove, reply_cancel_keyboard
@@ -130,24 +130,26 @@ async def process_profile_photo(message: types.Message, state: FSMContext):
     }
     car = Car(**car_data)
 
-    save_path = f'{car.name}.jpg'
-
-    for photo_id in (front_photo_id, profile_photo_id):
-        await async_telegram_service.save_file(
-            file_id=photo_id,
-            save_path=f'{photo_id}_{save_path}'
+    if settings.TELEGRAM_MEDIA_MODE == 'eager':
+        save_path = f'{car.name}.jpg'
+
+        # Фото скачиваются параллельно сразу в хранилище медиа
+        car.front_photo, car.profile_photo = await asyncio.gather(
+            async_telegram_service.save_file(
+                file_id=front_photo_id,
+                save_path=Car.front_photo.field.generate_filename(car, save_path),
+            ),
+            async_telegram_service.save_file(
+                file_id=profile_photo_id,
+                save_path=Car.profile_photo.field.generate_filename(car, save_path),
+            ),
         )
+    else:
+        # Фото скачаются при первом просмотре в админке
+        car.front_photo_file_id = front_photo_id
+        car.profile_photo_file_id = profile_photo_id
 
-    with open(f'{front_photo_id}_{save_path}', 'rb') as front_photo:
-        with open(f'{profile_photo_id}_{save_path}', 'rb') as profile_photo:
-            car.front_photo = ImageFile(front_photo)
-            car.profile_photo = ImageFile(profile_photo)
-
-            await car.asave()
-            os.remove(front_photo.name) \
-                if os.path.exists(front_photo.name) else None
-            os.remove(profile_photo.name) \
-                if os.path.exists(profile_photo.name) else None
+    await car.asave()
 
     await state.clear()
     await message.answer_photo(
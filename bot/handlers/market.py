@@ -1,5 +1,4 @@
 import os
-from typing import List
 
 from aiogram import Router, types, F
 from aiogram.filters import StateFilter, or_f
@@ -17,11 +16,13 @@ from bot.keyboards.reply import reply_location_keyboard, reply_contact_keyboard,
 from bot.orm.payment import create_payment
 from bot.states.product import ProductState
 from bot.utils.location import get_message_address
-from bot.utils.pagination import Paginator, get_pagination_buttons
+from bot.utils.pagination import get_pagination_buttons
+from bot.utils.texts import out_of_stock_string
+from web.apps.products.catalog import product_catalog_cache
 from web.apps.products.models import Product
 
 from web.apps.telegram_users.models import TelegramUser
-from web.services.api_2gis import api_2gis_service, API2GisError
+from web.services.api_2gis import API2GisError
 
 router = Router()
 
@@ -32,16 +33,14 @@ async def marker_callback_handler(
 ):
     page_number = int(callback.data.split('_')[-1])
     per_page = 10
-    products: List[Product] = await Product.objects.a_all()
-    paginator = Paginator(
-        array=products,
+    paginator = await product_catalog_cache.aget_page(
         page_number=page_number,
         per_page=per_page,
     )
 
     buttons = {
-        product.name: f'product_{product.id}_{page_number}'
-        for product in paginator.get_page()
+        name: f'product_{product_id}_{page_number}'
+        for product_id, name in paginator.get_page()
     }
     pagination_buttons = get_pagination_buttons(
         paginator, prefix='market_'
@@ -116,7 +115,8 @@ async def buy_product_callback_handler(
 
 @router.message(
     ProductState.address,
-    or_f(F.text, F.location)
+    or_f(F.text, F.location),
+    flags={'throttling': 'address'},
 )
 async def process_address_message_handler(
     message: types.Message,
@@ -210,6 +210,10 @@ async def process_phone_number_message_handler(
                 'phone_number': state_data['phone_number']
             }
         )
+        if yookassa_payment_response is None:
+            await message.answer(out_of_stock_string)
+            await state.clear()
+            return
 
         reply_markup = get_link_button_inline_keyboard(
             button_text='Оплатить 💳',
@@ -218,9 +222,7 @@ async def process_phone_number_message_handler(
         points = yookassa_payment_response.metadata.get('points')
         await message.answer(
             f'Начислим {points} баллов.\n\n'
-            '<b>ВАЖНО:</b> после оплаты обязательно нажмите '
-            'на кнопку <b><em>"Вернуться на сайт"</em></b>, '
-            'чтобы завершить оплату.',
+            'После оплаты мы пришлем уведомление в этот чат.',
             reply_markup=reply_markup,
         )
         return
@@ -257,6 +259,10 @@ async def send_payment_product_callback_handler(
             'phone_number': state_data['phone_number']
         }
     )
+    if yookassa_payment_response is None:
+        await callback.message.edit_text(out_of_stock_string)
+        await state.clear()
+        return
 
     reply_markup = get_link_button_inline_keyboard(
         button_text='Оплатить 💳',
@@ -266,9 +272,7 @@ async def send_payment_product_callback_handler(
     await callback.message.edit_text(
         'Оплата товара.\n'
             f'Начислим {points} баллов.\n\n'
-            '<b>ВАЖНО:</b> после оплаты обязательно нажмите '
-            'на кнопку <b><em>"Вернуться на сайт"</em></b>, '
-            'чтобы завершить оплату.',
+            'После оплаты мы пришлем уведомление в этот чат.',
         reply_markup=reply_markup,
     )
 
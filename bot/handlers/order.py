@@ -10,16 +10,18 @@ from django.conf import settings
 
 from bot.keyboards.inline import get_inline_keyboard, get_link_button_inline_keyboard
 from bot.keyboards.reply import reply_cancel_keyboard, reply_location_keyboard, reply_keyboard_remove
+from bot.orm.order import get_order_quote
 from bot.orm.payment import create_payment
 from bot.states.order import OrderState
 from bot.states.points import WriteOffPointsState
 from bot.utils.location import get_message_address
-from bot.utils.texts import address_string
+from bot.utils.texts import address_string, out_of_stock_string
 from bot.valiators.taxi_driver import OrderStateValidator
+from web.apps.orders.dispatch import cancel_order_dispatch
 from web.apps.orders.models import Order, Payment, OrderPriceSettings
 from web.apps.products.models import Product
-from web.apps.telegram_users.models import TelegramUser, TaxiDriver
-from web.services.api_2gis import api_2gis_service, API2GisError
+from web.apps.telegram_users.models import TelegramUser
+from web.services.api_2gis import API2GisError
 from web.services.yookassa import create_yookassa_payment
 
 router = Router()
@@ -66,15 +68,37 @@ async def validate_address_city(message: types.Message, from_address: str):
     return from_address_city in settings.ORDER_CITIES
 
 
+async def update_order_quote(
+        message: types.Message,
+        state: FSMContext,
+) -> dict:
+    state_data = await state.get_data()
+    telegram_user = await TelegramUser.objects.aget(
+        telegram_id=message.chat.id
+    )
+
+    quote = await get_order_quote(
+        from_address_data=state_data['from_address'],
+        to_address_data=state_data['to_address'],
+        tariff=telegram_user.tariff,
+    )
+    await state.update_data(quote=quote)
+
+    return quote
+
+
 async def send_order_message(
         message: types.Message,
         from_address: str,
         to_address: str,
+        quote: dict,
 ):
     await message.answer(
         '<b>Данные поездки:</b>\n\n'
         f'<b>Адрес отправки:</b> <em>{from_address}</em>\n'
-        f'<b>Адрес назначения:</b> <em>{to_address}</em>\n',
+        f'<b>Адрес назначения:</b> <em>{to_address}</em>\n'
+        f'<b>Примерное время поездки:</b> <em>{quote["travel_time_minutes"]} минут</em>\n'
+        f'<b>Стоимость:</b> <em>{quote["price"]} руб.</em>\n',
         reply_markup=get_inline_keyboard(
             buttons={
                 'Указать другой адрес отправки ✍️': 'edit_from_address',
@@ -88,7 +112,8 @@ async def send_order_message(
 
 @router.message(
     OrderState.from_address,
-    or_f(F.text, F.location)
+    or_f(F.text, F.location),
+    flags={'throttling': 'address'},
 )
 async def process_from_address(
         message: types.Message,
@@ -128,7 +153,14 @@ async def process_from_address(
 
     if to_address_data:
         to_address = to_address_data['address']
-        await send_order_message(message, from_address, to_address)
+
+        try:
+            quote = await update_order_quote(message, state)
+        except API2GisError as e:
+            await message.answer(str(e))
+            return
+
+        await send_order_message(message, from_address, to_address, quote)
         return
 
     await message.answer(
@@ -142,7 +174,8 @@ async def process_from_address(
 
 @router.message(
     OrderState.to_address,
-    or_f(F.text, F.location)
+    or_f(F.text, F.location),
+    flags={'throttling': 'address'},
 )
 async def process_to_address(message: types.Message, state: FSMContext):
     await message.answer(
@@ -163,7 +196,8 @@ async def process_to_address(message: types.Message, state: FSMContext):
             'lon': to_lon
         }
         await state.update_data(to_address=to_address_data)
-        await send_order_message(message, from_address, to_address)
+        quote = await update_order_quote(message, state)
+        await send_order_message(message, from_address, to_address, quote)
     except API2GisError as e:
         error_msg = str(e) if not message.location else (
             'Не получилось распознать адрес по геопозиции(\n\n'
@@ -197,7 +231,7 @@ async def edit_to_address_callback_handler(
     await state.set_state(OrderState.to_address)
 
 
-@router.callback_query(F.data == 'create_order')
+@router.callback_query(F.data == 'create_order', flags={'throttling': 'order'})
 async def create_order_callback_handler(
         callback: types.CallbackQuery,
         state: FSMContext,
@@ -209,6 +243,15 @@ async def create_order_callback_handler(
 
     from_address_data = state_data['from_address']
     to_address_data = state_data['to_address']
+
+    try:
+        quote = state_data.get('quote') \
+            or await update_order_quote(callback.message, state)
+    except API2GisError as e:
+        await callback.message.edit_text(str(e))
+        await state.clear()
+        return
+
     order_data = {
         'type': state_data['type'],
         'telegram_user_id': telegram_user.id,
@@ -220,14 +263,12 @@ async def create_order_callback_handler(
         'to_address': to_address_data['address'],
         'to_latitude': to_address_data['lat'],
         'to_longitude': to_address_data['lon'],
-    }
 
-    try:
-       await Order.objects.acreate(**order_data)
-    except API2GisError as e:
-        await callback.message.edit_text(str(e))
-        await state.clear()
-        return
+        'travel_length_km': quote['travel_length_km'],
+        'travel_time_minutes': quote['travel_time_minutes'],
+        'price': quote['price'],
+    }
+    await Order.objects.acreate(**order_data)
 
     await callback.message.delete()
     await callback.message.answer('<em>Поиск водителей . . .</em>')
@@ -237,19 +278,16 @@ async def create_order_callback_handler(
 @router.callback_query(F.data.startswith('accept_order_'))
 async def accept_order_callback_handler(callback: types.CallbackQuery):
     order_id, driver_id = callback.data.split('_')[-2:]
-    order: Order = await Order.objects.aget(id=order_id)
-    taxi_driver: TaxiDriver = await TaxiDriver.objects.aget(id=driver_id)
 
     await callback.message.edit_reply_markup(reply_markup=None)
 
-    if order.driver_id:
+    if not await Order.objects.aassign_driver(order_id, driver_id):
         await callback.message.edit_text(
             '<b><em>Вы уже выбрали водителя</em></b>'
         )
         return
 
-    order.driver_id = taxi_driver.id
-    await order.asave()
+    await sync_to_async(cancel_order_dispatch)(order_id)
 
     telegram_user = await TelegramUser.objects.aget(
         telegram_id=callback.from_user.id
@@ -269,9 +307,7 @@ async def accept_order_callback_handler(callback: types.CallbackQuery):
         await callback.message.edit_text(
             'Оплата поездки. После оплаты водитель направиться к вам.\n'
             f'Начислим {points} баллов.\n\n'
-            '<b>ВАЖНО:</b> после оплаты обязательно нажмите '
-            'на кнопку <b><em>"Вернуться на сайт"</em></b>, '
-            'чтобы завершить оплату.',
+            'После оплаты мы пришлем уведомление в этот чат.',
             reply_markup=reply_markup,
         )
         return
@@ -282,8 +318,8 @@ async def accept_order_callback_handler(callback: types.CallbackQuery):
         reply_markup=get_inline_keyboard(
             buttons={
                 f'Списать баллы ({telegram_user.points}) 💸': \
-                    f'write_off_points_order_{order.id}',
-                'Оплатить полностью 💳': f'send_payment_order_{order.id}',
+                    f'write_off_points_order_{order_id}',
+                'Оплатить полностью 💳': f'send_payment_order_{order_id}',
             }
         )
     )
@@ -308,9 +344,7 @@ async def send_payment_order_callback_handler(callback: types.CallbackQuery):
     await callback.message.edit_text(
         'Оплата поездки. После оплаты водитель направиться к вам.\n'
         f'Начислим {points} баллов.\n\n'
-        '<b>ВАЖНО:</b> после оплаты обязательно нажмите '
-        'на кнопку <b><em>"Вернуться на сайт"</em></b>, '
-        'чтобы завершить заказ.',
+        'После оплаты мы пришлем уведомление в этот чат.',
         reply_markup=reply_markup,
     )
 
@@ -321,11 +355,11 @@ async def write_off_points_callback_handler(
         state: FSMContext
 ):
     obj_type, obj_id = callback.data.split('_')[-2:]
-    model = Order if obj_type == 'order' else Product
 
+    # В хранилище FSM сохраняем только JSON-сериализуемые данные
     await state.update_data(
         obj_id=obj_id,
-        obj_model=model,
+        obj_type=obj_type,
     )
     await state.set_state(WriteOffPointsState.points_count)
 
@@ -343,12 +377,15 @@ async def process_points_count_handler(
     try:
         points_count = int(message.text)
     except ValueError:
+        points_count = 0
+
+    if points_count <= 0:
         await message.answer('Пожалуйста, отправьте корректное число баллов.')
         return
 
     state_data = await state.get_data()
 
-    model = state_data['obj_model']
+    model = Order if state_data['obj_type'] == 'order' else Product
     obj_id = state_data['obj_id']
     obj: Union[Order, Product] = await model.objects.aget(id=obj_id)
 
@@ -375,26 +412,41 @@ async def process_points_count_handler(
         return
 
     payment_kwargs['price'] = obj.price - points_count
+    # Нужны, чтобы вернуть баллы, если оплату придется вернуть
+    payment_kwargs.setdefault('metadata', {})['written_off_points'] = points_count
     telegram_user: TelegramUser = await TelegramUser.objects.aget(
         telegram_id=message.from_user.id
     )
     payment_kwargs['telegram_user_id'] = telegram_user.id
 
+    if not await TelegramUser.objects.awrite_off_points(
+        telegram_user.id,
+        points_count,
+    ):
+        await message.answer('Недостаточно баллов для списания')
+        return
+
     try:
-        telegram_user.points -= points_count
+        yookassa_payment_response = await create_payment(**payment_kwargs)
     except Exception:
-        await message.answer('Произошла ошибка', )
+        # Платеж не создан, списанные баллы нужно вернуть
+        await TelegramUser.objects.arefund_points(telegram_user.id, points_count)
+        await message.answer(
+            'Не удалось создать платеж, баллы возвращены. Попробуйте позже.'
+        )
+        raise
+
+    if yookassa_payment_response is None:
+        # Товар закончился, возвращаем списанные баллы
+        await TelegramUser.objects.arefund_points(telegram_user.id, points_count)
+        await message.answer(out_of_stock_string)
+        await state.clear()
         return
-    finally:
-        await telegram_user.asave()
 
     await message.answer('Баллы успешно списаны ✅')
-    yookassa_payment_response = await create_payment(**payment_kwargs)
     await message.answer(
         payment_text +
-        '<b>ВАЖНО:</b> после оплаты обязательно нажмите '
-        'на кнопку <b><em>"Вернуться на сайт"</em></b>, '
-        'чтобы завершить оплату.',
+        'После оплаты мы пришлем уведомление в этот чат.',
         reply_markup=InlineKeyboardMarkup(
         inline_keyboard=[[
             InlineKeyboardButton(
@@ -1,16 +1,14 @@
-import os
-
 from aiogram import Router, types, F
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from django.core.files.images import ImageFile
+from django.conf import settings
 
 from bot.keyboards.inline import get_inline_keyboard, inline_driver_keyboard, inline_user_keyboard
 from bot.keyboards.reply import reply_contact_keyboard, reply_keyboard_remove, reply_cancel_keyboard
 from bot.states.taxi_driver import TaxiDriverState
 from bot.valiators.taxi_driver import TaxiDriverStateValidator
 
-from web.apps.telegram_users.models import TelegramUser, TaxiDriver
+from web.apps.telegram_users.models import TelegramUser, TaxiDriver, PointsTransaction
 from web.services.telegram import async_telegram_service
 
 router = Router()
@@ -38,10 +36,16 @@ async def menu_callback_query_handler(
     user_type = callback.data.split('_')[-1]
     text = 'Выберите действие.'
     if user_type == 'user':
-        await TelegramUser.objects.aget_or_create(
+        telegram_user, created = await TelegramUser.objects.aget_or_create(
             telegram_id=callback.from_user.id,
             defaults={'username': callback.from_user.username}
         )
+        if created:
+            await PointsTransaction.objects.acreate(
+                telegram_user=telegram_user,
+                amount=telegram_user.points,
+                type=PointsTransaction.INITIAL,
+            )
 
         await callback.message.edit_text(
             text,
@@ -135,17 +139,20 @@ async def process_passport_photo(message: types.Message, state: FSMContext):
     }
     taxi_driver = TaxiDriver(**taxi_driver_data)
 
-    save_path = f'{taxi_driver.full_name}.jpg'
+    if settings.TELEGRAM_MEDIA_MODE == 'eager':
+        save_path = f'{taxi_driver.full_name}.jpg'
 
-    await async_telegram_service.save_file(
-        file_id=passport_photo_file_id,
-        save_path=save_path
-    )
+        taxi_driver.passport_photo = await async_telegram_service.save_file(
+            file_id=passport_photo_file_id,
+            save_path=TaxiDriver.passport_photo.field.generate_filename(
+                taxi_driver, save_path
+            ),
+        )
+    else:
+        # Фото скачается при первом просмотре в админке
+        taxi_driver.passport_photo_file_id = passport_photo_file_id
 
-    with open(save_path, 'rb') as file:
-        taxi_driver.passport_photo = ImageFile(file)
-        await taxi_driver.asave()
-        os.remove(file.name)
+    await taxi_driver.asave()
 
     await state.clear()
 
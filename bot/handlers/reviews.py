@@ -1,24 +1,19 @@
 from aiogram import Router, F, types
 
-from bot.keyboards.inline import get_inline_keyboard
-from web.apps.telegram_users.models import TaxiDriver, TelegramUser
+from web.apps.telegram_users.models import TaxiDriver
 
 router = Router()
 
 @router.callback_query(F.data.startswith('review_'))
 async def review_callback_handler(callback: types.CallbackQuery):
     user_type, review_mark, user_id = callback.data.split('_')[1:]
+    review_mark = int(review_mark)
 
-    if user_type == 'driver':
-        user_obj: TaxiDriver = await TaxiDriver.objects.aget(id=user_id)
-    elif user_type == 'user':
-        user_obj: TelegramUser = await TelegramUser.objects.aget(id=user_id)
-    else:
+    # Оценки есть только у водителей
+    if user_type != 'driver' or not 1 <= review_mark <= 5:
         return
 
-    user_obj.reviews.append(int(review_mark))
-
-    await user_obj.asave()
+    await TaxiDriver.objects.aadd_review(user_id, review_mark)
 
     await callback.message.edit_text(
         'Спасибо за вашу оценку ⭐️',
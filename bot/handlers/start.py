@@ -1,12 +1,12 @@
 ﻿import loguru
 from aiogram import Router, types
 from aiogram.filters import CommandStart, CommandObject
-from yookassa import Payment as YooKassaPayment
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
-from bot.handlers.payment import successful_payment_handler
 from bot.keyboards.inline import get_inline_keyboard
 from web.apps.orders.models import Payment
+from web.apps.orders.tasks import process_succeeded_payment_task
 from web.apps.telegram_users.models import TelegramUser
 
 router = Router()
@@ -37,33 +37,19 @@ async def start_command_handler(
     )
     telegram_user: TelegramUser = await TelegramUser.objects.aget(telegram_id=message.from_user.id)
 
-    if payment.telegram_user_id != telegram_user.id or payment.status == Payment.PAID:
+    if payment.telegram_user_id != telegram_user.id or payment.status != Payment.NOT_PAID:
         await send_start_message()
         return
 
-    yookassa_payment = YooKassaPayment.find_one(payment.yookassa_payment_id)
-
-    if not yookassa_payment.paid:
-        await message.answer('Оплата не выполнена')
-        return
-
-    payment.status = Payment.PAID
-    telegram_user.points += int(yookassa_payment.metadata.get('points'))
-
-    await payment.asave()
-    await telegram_user.asave()
-
-    await successful_payment_handler(message, payment, yookassa_payment)
-
-
-
-
-
-
-    
-    
-    
-
-    
-    
-
+    # Оплату подтверждает webhook YooKassa. Если уведомление не дошло,
+    # задача сама проверит статус платежа в API, повторный вызов безопасен
+    if payment.yookassa_payment_id:
+        await sync_to_async(process_succeeded_payment_task.delay)(
+            payment.yookassa_payment_id,
+            notify_not_paid=True,
+        )
+
+    await message.answer(
+        'Платеж обрабатывается ⏳\n\n'
+        '<em>Мы пришлем сообщение, как только оплата будет подтверждена.</em>'
+    )
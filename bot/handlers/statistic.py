@@ -1,5 +1,6 @@
-from datetime import date, datetime
-from typing import Union
+import calendar
+from datetime import date, datetime, time, timedelta
+from typing import Tuple, Union
 
 from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
@@ -10,14 +11,46 @@ from bot.keyboards.inline import get_inline_keyboard
 from bot.keyboards.reply import get_reply_calendar_keyboard
 from bot.states.statistic import DateState
 from bot.utils.bot import edit_text_or_answer
-from bot.utils.pagination import Paginator, get_pagination_buttons
+from bot.utils.pagination import get_pagination_buttons
 from bot.utils import texts
-from bot.utils.texts import get_order_info_message
-from web.apps.orders.models import Order
+from bot.utils.texts import get_order_info_message, get_driver_stats_message
+from web.apps.orders.models import Order, DriverDailyStats
 from web.apps.telegram_users.models import TaxiDriver, TelegramUser
+from web.utils.pagination import Paginator
 
 router = Router()
 
+
+def get_day_range(day: date) -> Tuple[datetime, datetime]:
+    """
+    Возвращает границы дня в текущем часовом поясе.
+    Фильтр по диапазону created_at использует индекс, в отличие от __date.
+    """
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    return day_start, day_start + timedelta(days=1)
+
+
+def get_driver_orders(driver_id: int, day: date):
+    """
+    Завершенные заказы водителя за день.
+    Совпадает с выборкой DriverDailyStats, чтобы список и прибыль сходились.
+    """
+    day_start, day_end = get_day_range(day)
+
+    return Order.objects.filter(
+        driver_id=driver_id,
+        created_at__gte=day_start,
+        created_at__lt=day_end,
+        completed_at__isnull=False,
+    ).order_by('created_at')
+
+
+async def get_driver_id(telegram_id: int) -> int:
+    return await TaxiDriver.objects.filter(
+        telegram_id=telegram_id
+    ).values_list('id', flat=True).aget()
+
+
 @router.callback_query(F.data.startswith('statistic_'))
 async def statistic_callback_handler(callback: types.CallbackQuery):
     if not await is_car_approved_handler(callback):
@@ -66,6 +99,11 @@ async def year_statistic_callback_handler(
 ):
     year, previous_page_number = map(int, callback.data.split('_')[-2:])
     now = timezone.now()
+    year_stats = await DriverDailyStats.objects.aget_summary(
+        driver_id=await get_driver_id(callback.from_user.id),
+        date_from=date(year, 1, 1),
+        date_to=date(year, 12, 31),
+    )
     year_months_names = texts.months if year != now.year else texts.months[:now.month]
 
     buttons = {
@@ -77,6 +115,8 @@ async def year_statistic_callback_handler(
     sizes = (1,) * (len(buttons))
 
     await callback.message.edit_text(
+        f'<b>Статистика за {year} год</b>\n\n'
+        f'{get_driver_stats_message(year_stats)}\n'
         'Выберите месяц',
         reply_markup=get_inline_keyboard(
             buttons=buttons,
@@ -91,12 +131,19 @@ async def month_statistic_callback_handler(
         state: FSMContext,
 ):
     month, year = map(int, callback.data.split('_')[-2:])
+    month_stats = await DriverDailyStats.objects.aget_summary(
+        driver_id=await get_driver_id(callback.from_user.id),
+        date_from=date(year, month, 1),
+        date_to=date(year, month, calendar.monthrange(year, month)[1]),
+    )
 
     await state.update_data(year=year, month=month)
     await state.set_state(DateState.day)
 
     await callback.message.delete()
     await callback.message.answer(
+        f'<b>Статистика за {texts.months[month - 1].lower()} {year}</b>\n\n'
+        f'{get_driver_stats_message(month_stats)}\n'
         'Выберите дату',
         reply_markup=get_reply_calendar_keyboard(
             year=year,
@@ -115,40 +162,41 @@ async def day_statistic_handler(
     month = state_data['month']
 
     try:
-        day = int(message.text)
+        statistic_date = date(year=year, month=month, day=int(message.text))
     except ValueError:
         await message.answer('Пожалуйста, выберите день из календаря.')
         return
 
-    statistic_date = date(year=year, month=month, day=day)
     statistic_date_string = statistic_date.strftime("%d.%m.%Y")
 
-    taxi_driver: TaxiDriver = await TaxiDriver.objects.aget(
-        telegram_id=message.from_user.id,
-    )
-    orders = await Order.objects.afilter(
-        driver_id=taxi_driver.id,
-        created_at__date=statistic_date
-    )
+    driver_id = await get_driver_id(message.from_user.id)
+    # Одиннадцатый заказ нужен только чтобы понять, что заказов больше 10
+    orders = [
+        order async for order in
+        get_driver_orders(driver_id, statistic_date)[:11]
+    ]
     if not orders:
         await message.answer(
-            f'{statistic_date_string} нет заказов.'
+            f'{statistic_date_string} нет завершенных заказов.'
         )
         return
 
-    text = f'<b>Заказы на {statistic_date_string}</b>\n\n'
+    text = f'<b>Завершенные заказы на {statistic_date_string}</b>\n\n'
 
-    total_profit = 0
     for order in orders[:10]:
         text += f'{get_order_info_message(order)}\n\n'
-        total_profit += order.price
 
     buttons = {}
     if len(orders) > 10:
         buttons['Отправить всю статистику 📥'] = \
             f'send_statistic_{statistic_date_string}'
     else:
-        text += f'Общая прибыль: <em><b>{int(total_profit)}</b> рублей</em>'
+        day_stats = await DriverDailyStats.objects.aget_summary(
+            driver_id=driver_id,
+            date_from=statistic_date,
+            date_to=statistic_date,
+        )
+        text += f'Общая прибыль: <em><b>{int(day_stats["revenue"])}</b> рублей</em>'
 
 
     buttons['Назад 🔙'] = f'month_statistic_{month}_{year}'
@@ -168,32 +216,32 @@ async def send_statistic_handler(
         statistic_date_string, '%d.%m.%Y'
     ).date()
 
-    taxi_driver: TaxiDriver = await TaxiDriver.objects.aget(
-        telegram_id=callback.from_user.id,
-    )
-    orders = await Order.objects.afilter(
-        driver_id=taxi_driver.id,
-        created_at__date=statistic_date
-    )
-    if not orders:
+    driver_id = await get_driver_id(callback.from_user.id)
+    orders = get_driver_orders(driver_id, statistic_date)
+    if not await orders.aexists():
         await callback.message.answer(
-            f'{statistic_date_string} нет заказов.'
+            f'{statistic_date_string} нет завершенных заказов.'
         )
         return
 
     await callback.message.edit_reply_markup(reply_markup=None)
 
     text = ''
-    total_profit = 0
-    for order in orders:
+    async for order in orders:
         if len(text) > 3500:
             await callback.message.answer(text)
             text = ''
 
         text += f'{get_order_info_message(order)}\n\n'
-        total_profit += order.price
 
+    day_stats = await DriverDailyStats.objects.aget_summary(
+        driver_id=driver_id,
+        date_from=statistic_date,
+        date_to=statistic_date,
+    )
     await callback.message.answer(text)
-    await callback.message.answer(f'Общая прибыль: <em><b>{total_profit}</b> рублей</em>')
+    await callback.message.answer(
+        f'Общая прибыль: <em><b>{int(day_stats["revenue"])}</b> рублей</em>'
+    )
 
 
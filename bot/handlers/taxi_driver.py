@@ -1,6 +1,7 @@
 from typing import Optional
 
 from aiogram import Router, types, F
+from aiogram.filters import StateFilter
 from asgiref.sync import sync_to_async
 
 from bot.keyboards.inline import (
@@ -16,6 +17,8 @@ from web.apps.telegram_users.models import (
     Car,
     TariffDriverRequest
 )
+from web.services.driver_locations import driver_location_index
+from web.services.rate_limit import Priority, use_telegram_priority
 
 router = Router()
 
@@ -82,6 +85,11 @@ async def is_active_callback_handler(callback: types.CallbackQuery):
         'Смена: '
         f'<b>{"включена ✅" if taxi_driver.is_active else "выключена ❌"}</b>'
     )
+    if taxi_driver.is_active:
+        message_text += (
+            '\n\nЧтобы получать заказы поблизости, '
+            'транслируйте боту свою геопозицию 📍'
+        )
     buttons = {
         button_text: 'driver_change-is_active',
         'Назад 🔙': 'menu_driver',
@@ -108,12 +116,41 @@ async def driver_change_field_callback_handler(callback: types.CallbackQuery):
     change_field_value = getattr(taxi_driver, change_field_name)  # Достаём значение нужного поля
     setattr(taxi_driver, change_field_name, not change_field_value)  # Изменяем значение нужного поля на противоположное
 
-    await taxi_driver.asave()
+    await taxi_driver.asave(update_fields=[change_field_name])
 
     if change_field_name == 'is_active':
+        if not taxi_driver.is_active:
+            await driver_location_index.aremove(taxi_driver.telegram_id)
+
         await is_active_callback_handler(callback)
 
 
+async def update_driver_location(message: types.Message):
+    is_active_driver = await TaxiDriver.objects.filter(
+        telegram_id=message.from_user.id,
+        is_active=True,
+    ).aexists()
+
+    if not is_active_driver:
+        return
+
+    await driver_location_index.aupdate(
+        telegram_id=message.from_user.id,
+        lat=message.location.latitude,
+        lon=message.location.longitude,
+    )
+
+
+@router.message(StateFilter(None), F.location.live_period)
+async def driver_live_location_handler(message: types.Message):
+    await update_driver_location(message)
+
+
+@router.edited_message(F.location)
+async def driver_edited_location_handler(message: types.Message):
+    await update_driver_location(message)
+
+
 @router.callback_query(F.data == 'driver_tariff')
 async def driver_tariff_callback_handler(callback: types.CallbackQuery):
     taxi_driver: TaxiDriver = await TaxiDriver.objects.aget(
@@ -193,8 +230,10 @@ async def driver_take_order_handler(
 
     if order.driver_id:
         text = 'Извини, но кто-то успел принять заказ до тебя'
-        await callback.answer(text) if from_channel \
-            else callback.message.edit_text(text, reply_markup=None)
+        if from_channel:
+            await callback.answer(text)
+        else:
+            await callback.message.edit_text(text, reply_markup=None)
         return
 
     driver_rating = f'{taxi_driver.rating} ⭐️' if taxi_driver.rating else 'нет оценки'
@@ -280,6 +319,14 @@ async def cancel_end_order_callback_handler(callback: types.CallbackQuery):
 @router.callback_query(F.data.startswith('confirm_end_order_'))
 async def confirm_end_order_callback_handler(callback: types.CallbackQuery):
     order_id = callback.data.split('_')[-1]
+
+    if not await Order.objects.acomplete(order_id):
+        await callback.message.edit_text(
+            'Заказ уже завершен ✅',
+            reply_markup=None,
+        )
+        return
+
     order: Order = await Order.objects.aget(id=order_id)
     taxi_driver: TaxiDriver = await TaxiDriver.objects.aget(id=order.driver_id)
     order_telegram_user: TelegramUser = await TelegramUser.objects.aget(
@@ -291,13 +338,14 @@ async def confirm_end_order_callback_handler(callback: types.CallbackQuery):
         reply_markup=None,
     )
 
-    await callback.bot.send_message(
-        chat_id=order_telegram_user.telegram_id,
-        text='Пожалуйста, оцените водителя',
-        reply_markup=get_inline_review_driver_keyboard(
-            driver_id=taxi_driver.id
+    with use_telegram_priority(Priority.LOW):
+        await callback.bot.send_message(
+            chat_id=order_telegram_user.telegram_id,
+            text='Пожалуйста, оцените водителя',
+            reply_markup=get_inline_review_driver_keyboard(
+                driver_id=taxi_driver.id
+            )
         )
-    )
 
 
 
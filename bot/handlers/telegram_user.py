@@ -48,10 +48,9 @@ async def tariff_callback_handler(callback: types.CallbackQuery):
 @router.callback_query(F.data.startswith('change_tariff_'))
 async def change_tariff_callback_handler(callback: types.CallbackQuery):
     tariff = callback.data.split('_')[-1]
-    telegram_user: TelegramUser = await TelegramUser.objects.aget(
+    # Меняем только тариф, чтобы не затереть баллы, измененные параллельно
+    await TelegramUser.objects.filter(
         telegram_id=callback.from_user.id,
-    )
-    telegram_user.tariff = tariff
-    await telegram_user.asave()
+    ).aupdate(tariff=tariff)
 
     await tariff_callback_handler(callback)
\ No newline at end of file
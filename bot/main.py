@@ -14,20 +14,40 @@ async def main():
 
     django.setup()
 
-    from middlewares.throttling import rate_limit_middleware
+    from middlewares.throttling import ThrottlingMiddleware
+    from middlewares.rate_limit import TelegramRateLimitMiddleware
     from handlers.routing import get_main_router
+    from utils.storage import get_fsm_storage, get_events_isolation
+    from utils.webhook import run_webhook
+    from web.services.api_2gis import async_api_2gis_service
+    from web.services.telegram import async_telegram_service
 
     bot = Bot(
         token=settings.BOT_TOKEN,
         default=DefaultBotProperties(parse_mode='HTML'),
     )
-    dp = Dispatcher()
+    bot.session.middleware(TelegramRateLimitMiddleware())
+    storage = get_fsm_storage()
+    dp = Dispatcher(
+        storage=storage,
+        events_isolation=get_events_isolation(storage),
+    )
     
     try:
-        dp.message.middleware(rate_limit_middleware)
+        await async_telegram_service.startup()
+        dp.message.middleware(ThrottlingMiddleware('message'))
+        dp.callback_query.middleware(ThrottlingMiddleware('callback_query'))
         dp.include_router(get_main_router())
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+
+        if settings.BOT_MODE == 'webhook':
+            await run_webhook(dp, bot)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        await async_api_2gis_service.close()
+        await async_telegram_service.shutdown()
+        await dp.fsm.close()
         await bot.session.close()
 
 
@@ -0,0 +1,49 @@
+import asyncio
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from django.conf import settings
+from loguru import logger
+
+from web.services.rate_limit import telegram_rate_limiter
+
+RATE_LIMITED_METHOD_PREFIXES = ('send', 'copy', 'forward')
+
+
+class TelegramRateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Request middleware бота, отправляющий сообщения через общий
+    с Celery ограничитель и повторяющий запрос после ответа 429.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, 'chat_id', None)
+        is_rate_limited = chat_id is not None and \
+            method.__api_method__.startswith(RATE_LIMITED_METHOD_PREFIXES)
+
+        for attempt in range(settings.TELEGRAM_MAX_RETRIES + 1):
+            if is_rate_limited:
+                await telegram_rate_limiter.aacquire(chat_id)
+
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == settings.TELEGRAM_MAX_RETRIES:
+                    raise
+
+                logger.warning(
+                    f'Telegram 429 on {method.__api_method__}, '
+                    f'retry after {e.retry_after}s'
+                )
+                await asyncio.sleep(e.retry_after)
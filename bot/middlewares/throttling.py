@@ -1,40 +1,87 @@
-﻿import time
-from typing import Dict, Coroutine
+﻿from typing import Any, Awaitable, Callable, Dict, Tuple
 
-from loguru import logger
-from aiogram.types import Message
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, Message, CallbackQuery
 from django.conf import settings
 
+from web.services.cache import LRUCache, MISSING
+from web.services.rate_limit import TokenBucket
 
-async def rate_limit_middleware(
-    handler: Coroutine,
-    event: Message,
-    data: Dict
-):
-    """Middleware для ограничения отправки сообщений пользователем боту."""
+THROTTLING_TEXT = 'Слишком много запросов! Попробуйте позже.'
 
-    user_id = event.from_user.id
-    current_time = time.time()
 
-    if not hasattr(rate_limit_middleware, 'users'):
-        rate_limit_middleware.users = {}
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Middleware для ограничения частоты запросов пользователя к боту.
 
-    if user_id not in rate_limit_middleware.users:
-        rate_limit_middleware.users[user_id] = {
-            'last_message_time': current_time,
-            'warning_sent': False
-        }
-        return await handler(event, data)
+    Лимиты считаются token bucket в Redis и общие для всех экземпляров бота.
+    Помимо лимита на тип апдейта, хэндлер может задать группу
+    с отдельным лимитом через флаг throttling, например
+    flags={'throttling': 'order'}.
+
+    Заблокированные пользователи запоминаются в локальном LRU до истечения
+    ожидания, чтобы повторные запросы отсекались без обращения к Redis.
+    """
+
+    def __init__(
+            self,
+            update_type: str,
+            rates: Dict[str, Tuple[int, int]] = settings.THROTTLING_RATES,
+            local_cache_size: int = settings.THROTTLING_LOCAL_CACHE_SIZE,
+    ):
+        self.update_type = update_type
+        self.rates = rates
+        self.blocked_users = LRUCache(maxsize=local_cache_size)
+
+    def get_bucket(self, group: str, user_id: int) -> TokenBucket:
+        limit, period_seconds = self.rates[group]
+
+        return TokenBucket(
+            key=f'bot:throttling:{group}:{user_id}',
+            capacity=limit,
+            rate=limit / period_seconds,
+        )
+
+    async def is_throttled(
+            self,
+            event: TelegramObject,
+            group: str,
+            user_id: int,
+    ) -> bool:
+        key = (group, user_id)
+        if self.blocked_users.get(key) is not MISSING:
+            return True
 
-    user_data = rate_limit_middleware.users[user_id]
-    last_message_time = user_data['last_message_time']
+        wait = await self.get_bucket(group, user_id).atry_acquire()
+        if not wait:
+            return False
 
-    if current_time - last_message_time < settings.MAX_MESSAGE_PER_SECOND:
-        if not user_data['warning_sent']:
-            await event.answer('Слишком много сообщений! Попробуйте позже.')
-            user_data['warning_sent'] = True 
-        return  
+        self.blocked_users.set(key, True, ttl=wait)
+        await self.warn(event)
+        return True
 
-    user_data['last_message_time'] = current_time
-    user_data['warning_sent'] = False  
-    return await handler(event, data)
+    @staticmethod
+    async def warn(event: TelegramObject):
+        if isinstance(event, (Message, CallbackQuery)):
+            await event.answer(THROTTLING_TEXT)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        groups = [self.update_type, get_flag(data, 'throttling')]
+        for group in groups:
+            if group not in self.rates:
+                continue
+
+            if await self.is_throttled(event, group, user.id):
+                return
+
+        return await handler(event, data)
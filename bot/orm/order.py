@@ -0,0 +1,35 @@
+from typing import Dict
+
+from web.apps.orders.models import Order, OrderPriceSettings
+from web.apps.telegram_users.models import TelegramUser
+from web.services.api_2gis import async_api_2gis_service
+
+
+async def get_order_quote(
+        from_address_data: Dict,
+        to_address_data: Dict,
+        tariff: TelegramUser.tariff,
+) -> Dict:
+    """Рассчитывает длину, время и стоимость поездки до создания заказа."""
+    travel_length_meters, travel_time_seconds = \
+        await async_api_2gis_service.get_route_distance_and_duration(
+            from_lat=from_address_data['lat'],
+            from_lon=from_address_data['lon'],
+            to_lat=to_address_data['lat'],
+            to_lon=to_address_data['lon'],
+        )
+    travel_length_km = travel_length_meters / 1000
+    travel_time_minutes = round(travel_time_seconds / 60)
+
+    price = Order.calculate_route_price(
+        travel_length_km=travel_length_km,
+        travel_time_minutes=travel_time_minutes,
+        tariff=tariff,
+        price_settings=await OrderPriceSettings.aload(),
+    )
+
+    return {
+        'travel_length_km': travel_length_km,
+        'travel_time_minutes': travel_time_minutes,
+        'price': price,
+    }
@@ -1,11 +1,11 @@
-from typing import Optional
+from typing import Optional, Tuple
 
 from asgiref.sync import sync_to_async
 from django.db import transaction
 from yookassa.domain.response import PaymentResponse
 
 from web.apps.orders.models import Order, OrderPriceSettings, Payment, PointsSettings
-from web.apps.products.models import Product
+from web.apps.products.models import Product, ProductReservation
 from web.apps.telegram_users.models import TelegramUser
 from web.services.yookassa import create_yookassa_payment
 
@@ -24,14 +24,63 @@ async def create_order_payment(
     )
 
 
-@sync_to_async
-def create_payment(
+async def create_payment(
         telegram_user_id: TelegramUser.id,
         price: Optional[Order.id] = None,
         order_id: Optional[Order.id] = None,
         product_id: Optional[Product.id] = None,
         metadata: Optional[dict] = None,
 ) -> PaymentResponse | None:
+    """
+    Создает платеж в YooKassa.
+    Возвращает None, если товара для оплаты не осталось на складе.
+    """
+    prepared_payment = await prepare_payment(
+        telegram_user_id=telegram_user_id,
+        price=price,
+        order_id=order_id,
+        product_id=product_id,
+        metadata=metadata,
+    )
+    if prepared_payment is None:
+        return None
+
+    payment, payment_description, metadata = prepared_payment
+
+    # Запрос в YooKassa с повторами идет в отдельном потоке, чтобы
+    # не занимать общий поток ORM на время ответа платежной системы
+    try:
+        yookassa_payment_response = await sync_to_async(
+            create_yookassa_payment, thread_sensitive=False
+        )(
+            db_payment_id=payment.id,
+            amount=payment.price,
+            description=payment_description,
+            metadata=metadata,
+        )
+    except Exception:
+        await sync_to_async(rollback_payment)(payment)
+        raise
+
+    await Payment.objects.filter(id=payment.id).aupdate(
+        yookassa_payment_id=yookassa_payment_response.id
+    )
+
+    return yookassa_payment_response
+
+
+@sync_to_async
+def prepare_payment(
+        telegram_user_id: TelegramUser.id,
+        price: Optional[Order.id] = None,
+        order_id: Optional[Order.id] = None,
+        product_id: Optional[Product.id] = None,
+        metadata: Optional[dict] = None,
+) -> Tuple[Payment, str, dict] | None:
+    """
+    Сохраняет платеж со статусом "Не оплачен" и резервирует товар.
+    Возвращает платеж, описание и metadata для YooKassa.
+    """
     payment = Payment(
         price=price,
         telegram_user_id=telegram_user_id
@@ -49,8 +98,7 @@ def create_payment(
         metadata['type'] = 'order'
 
     elif product_id:
-        obj: Product = Product.objects.get(id=product_id)
-        obj.quantity -= 1
+        obj: Product = Product.objects.only('id', 'price').get(id=product_id)
         payment.product = obj
         payment.type = Payment.PRODUCT
         payment_description += 'товара'
@@ -66,20 +114,21 @@ def create_payment(
     payment.price = price if price else obj.price
     metadata['points'] = points
 
+    # Короткая локальная транзакция, запрос в YooKassa идет уже после нее
     with transaction.atomic():
-        if product_id:
-            obj.save()
-
         payment.save()
-        yookassa_payment_response = create_yookassa_payment(
-            db_payment_id=payment.id,
-            amount=payment.price,
-            description=payment_description,
-            metadata=metadata,
-        )
 
-        payment.yookassa_payment_id = yookassa_payment_response.id
-        payment.save()
+        if product_id and not ProductReservation.objects.reserve(
+            product_id, payment.id
+        ):
+            transaction.set_rollback(True)
+            return None
 
+    return payment, payment_description, metadata
 
-    return yookassa_payment_response
+
+def rollback_payment(payment: Payment):
+    """Удаляет платеж, который не удалось создать в YooKassa."""
+    with transaction.atomic():
+        ProductReservation.objects.release(payment.id)
+        payment.delete()
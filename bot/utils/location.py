@@ -2,7 +2,7 @@ from typing import Tuple, Optional
 
 from aiogram import types
 
-from web.services.api_2gis import api_2gis_service
+from web.services.api_2gis import async_api_2gis_service
 
 
 async def get_message_address(
@@ -12,13 +12,15 @@ async def get_message_address(
 
     if message.text and not message.location:
         address_input = f'{city}, {message.text}' if city else message.text
-        address, cords = api_2gis_service.find_match_address(address_input)
+        address, cords = await async_api_2gis_service.find_match_address(
+            address_input
+        )
 
     elif message.location:
         location = message.location
 
         cords = (location.latitude, location.longitude)
-        address = api_2gis_service.get_address_by_cords(
+        address = await async_api_2gis_service.get_address_by_cords(
             lat=cords[0],
             lon=cords[1]
         )
@@ -0,0 +1,46 @@
+import json
+from functools import partial
+
+from aiogram.fsm.storage.base import BaseStorage, BaseEventIsolation
+from aiogram.fsm.storage.memory import MemoryStorage, DisabledEventIsolation
+from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
+from django.conf import settings
+
+REDIS_STORAGE = 'redis'
+MEMORY_STORAGE = 'memory'
+
+# Компактный JSON без пробелов и с кириллицей без экранирования
+compact_json_dumps = partial(json.dumps, separators=(',', ':'), ensure_ascii=False)
+
+
+def get_fsm_storage() -> BaseStorage:
+    """
+    Возвращает хранилище FSM бота.
+
+    Redis хранилище общее для всех экземпляров бота и переживает
+    перезапуск, in-memory подходит только для локальной разработки.
+    """
+    if settings.FSM_STORAGE == MEMORY_STORAGE:
+        return MemoryStorage()
+
+    return RedisStorage.from_url(
+        settings.FSM_REDIS_URL,
+        key_builder=DefaultKeyBuilder(with_bot_id=True),
+        state_ttl=settings.FSM_STATE_TTL,
+        data_ttl=settings.FSM_DATA_TTL,
+        json_dumps=compact_json_dumps,
+        json_loads=json.loads,
+    )
+
+
+def get_events_isolation(storage: BaseStorage) -> BaseEventIsolation:
+    """
+    Возвращает изоляцию событий одного чата.
+
+    Для Redis это распределенная блокировка, чтобы несколько экземпляров бота
+    не обрабатывали апдейты одного пользователя одновременно.
+    """
+    if isinstance(storage, RedisStorage):
+        return storage.create_isolation()
+
+    return DisabledEventIsolation()
@@ -1,3 +1,5 @@
+from typing import Dict
+
 from web.apps.orders.models import Order
 
 address_string = (
@@ -14,6 +16,8 @@ months = [
     'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'
 ]
 
+out_of_stock_string = 'К сожалению, товар закончился 😔'
+
 def get_order_info_message(order: Order) -> str:
     order_info_message = (
         '<b>Тип: '
@@ -23,4 +27,14 @@ def get_order_info_message(order: Order) -> str:
         f'<b>Cтоимость:</b> <em>{int(order.price)} руб.</em>\n'
     )
 
-    return order_info_message
\ No newline at end of file
+    return order_info_message
+
+def get_driver_stats_message(stats: Dict) -> str:
+    driver_stats_message = (
+        f'<b>Завершено заказов:</b> <em>{stats["orders_count"]}</em>\n'
+        f'<b>Выручка:</b> <em>{int(stats["revenue"])} руб.</em>\n'
+        f'<b>Пройдено:</b> <em>{round(stats["travel_length_km"], 1)} км</em>\n'
+        f'<b>В пути:</b> <em>{stats["travel_time_minutes"]} минут</em>\n'
+    )
+
+    return driver_stats_message
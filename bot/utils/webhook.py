@@ -0,0 +1,138 @@
+import asyncio
+import hmac
+import json
+import signal
+from typing import List
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from django.conf import settings
+from loguru import logger
+from pydantic import ValidationError
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class UpdateQueue:
+    """
+    Ограниченная очередь апдейтов с фиксированным числом обработчиков.
+
+    Webhook отвечает Telegram сразу после постановки апдейта в очередь.
+    Если очередь заполнена, Telegram получает 503 и повторит доставку позже.
+    """
+
+    def __init__(
+            self,
+            dp: Dispatcher,
+            bot: Bot,
+            maxsize: int = settings.BOT_UPDATE_QUEUE_SIZE,
+            workers_count: int = settings.BOT_UPDATE_WORKERS,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.queue: asyncio.Queue[Update] = asyncio.Queue(maxsize=maxsize)
+        self.workers_count = workers_count
+        self._workers: List[asyncio.Task] = []
+
+    def put(self, update: Update) -> bool:
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return False
+
+        return True
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logger.exception(f'Failed to process update {update.update_id}: {e}')
+            finally:
+                self.queue.task_done()
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.workers_count)
+        ]
+
+    async def stop(self, timeout: float = 10):
+        """Дожидается обработки принятых апдейтов и останавливает обработчиков."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'{self.queue.qsize()} updates were not processed')
+
+        for worker in self._workers:
+            worker.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+
+def get_webhook_app(update_queue: UpdateQueue) -> web.Application:
+    async def webhook_handler(request: web.Request) -> web.Response:
+        secret_token = request.headers.get(SECRET_TOKEN_HEADER, '')
+        if not hmac.compare_digest(secret_token, settings.BOT_WEBHOOK_SECRET):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(
+                await request.json(),
+                context={'bot': update_queue.bot},
+            )
+        except (json.JSONDecodeError, ValidationError) as e:
+            logger.warning(f'Invalid webhook update: {e}')
+            return web.Response(status=400)
+        if not update_queue.put(update):
+            logger.warning('Update queue is full')
+            return web.Response(status=503)
+
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(settings.BOT_WEBHOOK_PATH, webhook_handler)
+
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """Запускает бота в режиме webhook до получения SIGINT или SIGTERM."""
+    # Без секрета webhook принял бы апдейты от кого угодно
+    if not settings.BOT_WEBHOOK_SECRET:
+        raise RuntimeError('BOT_WEBHOOK_SECRET is required in webhook mode')
+
+    update_queue = UpdateQueue(dp, bot)
+    runner = web.AppRunner(get_webhook_app(update_queue))
+    await runner.setup()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    update_queue.start()
+
+    try:
+        await web.TCPSite(
+            runner,
+            host=settings.BOT_WEBHOOK_HOST,
+            port=settings.BOT_WEBHOOK_PORT,
+        ).start()
+        await bot.set_webhook(
+            url=settings.BOT_WEBHOOK_BASE_URL + settings.BOT_WEBHOOK_PATH,
+            secret_token=settings.BOT_WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=settings.BOT_WEBHOOK_MAX_CONNECTIONS,
+        )
+        logger.info('Bot webhook is listening')
+
+        await stop_event.wait()
+    finally:
+        # Сначала перестаем принимать апдейты, затем дообрабатываем очередь
+        await runner.cleanup()
+        await update_queue.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
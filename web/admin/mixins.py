@@ -1,6 +1,13 @@
+from typing import Dict
+
 from django.contrib import admin
-from django.http import HttpResponseRedirect
-from django.urls import reverse
+from django.contrib.admin.utils import quote, unquote
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponseRedirect
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from web.services.telegram_media import telegram_media_cache
 
 
 class NotAllowedToChangeMixin:
@@ -30,3 +37,79 @@ class SingletonModelAdmin(admin.ModelAdmin, NotAllowedToAddMixin):
         )
 
 
+class TelegramMediaAdminMixin:
+    """
+    Показывает фото, сохраненные как file_id Telegram.
+
+    telegram_media_fields сопоставляет ImageField с полем file_id.
+    Если файла в ImageField нет, фото отдается отдельной view, которая
+    при первом просмотре скачивает его в дисковый кэш.
+    """
+    telegram_media_fields: Dict[str, str] = {}
+    thumbnail_height = 100
+    photo_height = 400
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+
+        return [
+            path(
+                '<path:object_id>/telegram-media/<str:field_name>/',
+                self.admin_site.admin_view(self.telegram_media_view),
+                name='%s_%s_telegram_media' % info,
+            ),
+        ] + super().get_urls()
+
+    def telegram_media_view(self, request, object_id: str, field_name: str):
+        if field_name not in self.telegram_media_fields:
+            raise Http404
+
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_view_permission(request, obj):
+            raise PermissionDenied
+
+        file_id = getattr(obj, self.telegram_media_fields[field_name])
+        if not file_id:
+            raise Http404
+
+        if request.GET.get('thumbnail'):
+            file = telegram_media_cache.open_thumbnail(file_id)
+        else:
+            file = telegram_media_cache.open_original(file_id)
+
+        response = FileResponse(file, content_type='image/jpeg')
+        response['Cache-Control'] = 'private, max-age=86400'
+        return response
+
+    def get_photo_url(self, obj, field_name: str, thumbnail: bool = False):
+        image = getattr(obj, field_name)
+        if image:
+            return image.url
+
+        if not getattr(obj, self.telegram_media_fields[field_name]):
+            return None
+
+        url = reverse(
+            'admin:%s_%s_telegram_media' % (
+                self.opts.app_label,
+                self.opts.model_name,
+            ),
+            args=(quote(obj.pk), field_name),
+            current_app=self.admin_site.name,
+        )
+        return f'{url}?thumbnail=1' if thumbnail else url
+
+    def photo_html(self, obj, field_name: str, thumbnail: bool = False):
+        url = self.get_photo_url(obj, field_name)
+        if url is None:
+            return '-'
+
+        return format_html(
+            '<a href="{}" target="_blank">'
+            '<img src="{}" style="max-height: {}px" loading="lazy"></a>',
+            url,
+            self.get_photo_url(obj, field_name, thumbnail=thumbnail),
+            self.thumbnail_height if thumbnail else self.photo_height,
+        )
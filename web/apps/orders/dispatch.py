@@ -0,0 +1,114 @@
+from typing import List, Set
+
+import redis
+
+from django.conf import settings
+
+from web.services.redis import redis_client
+
+# Переводит рассылку к следующей волне, если она еще активна
+# и ожидает именно эту волну. Защищает от повторного запуска волны.
+CLAIM_WAVE_SCRIPT = '''
+local state = redis.call('HMGET', KEYS[1], 'status', 'wave')
+if state[1] ~= 'active' or tonumber(state[2]) ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'wave', tonumber(ARGV[1]) + 1)
+return 1
+'''
+
+
+class OrderDispatchState:
+    """
+    Состояние волновой рассылки заказа в Redis.
+
+    Хранит номер ожидаемой волны, статус рассылки, id отложенной
+    Celery задачи следующей волны и водителей, которым заказ уже предложен.
+    """
+    ACTIVE = 'active'
+    FINISHED = 'finished'
+
+    def __init__(
+            self,
+            waves: List[tuple] = settings.ORDER_DISPATCH_WAVES,
+            client: redis.Redis = redis_client,
+    ):
+        self.waves = waves
+        self.client = client
+        self._claim_wave_script = client.register_script(CLAIM_WAVE_SCRIPT)
+        # Состояние живет дольше всех волн вместе взятых
+        self.ttl = sum(timeout for _, _, timeout in waves) + 60 * 60
+
+    @staticmethod
+    def _key(order_id: int) -> str:
+        return f'order:dispatch:{order_id}'
+
+    @staticmethod
+    def _offered_key(order_id: int) -> str:
+        return f'order:dispatch:{order_id}:offered'
+
+    def start(self, order_id: int):
+        key = self._key(order_id)
+        pipe = self.client.pipeline()
+        pipe.delete(key, self._offered_key(order_id))
+        pipe.hset(key, mapping={'status': self.ACTIVE, 'wave': 0})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def claim_wave(self, order_id: int, wave: int) -> bool:
+        """Возвращает True, если волну wave нужно запустить."""
+        return bool(self._claim_wave_script(keys=[self._key(order_id)], args=[wave]))
+
+    def set_pending_task(self, order_id: int, task_id: str):
+        self.client.hset(self._key(order_id), 'task_id', task_id)
+
+    def finish(self, order_id: int) -> str | None:
+        """
+        Завершает рассылку.
+        Возвращает id отложенной задачи, если рассылка была активна.
+        """
+        key = self._key(order_id)
+        pipe = self.client.pipeline()
+        pipe.hmget(key, 'status', 'task_id')
+        pipe.hset(key, 'status', self.FINISHED)
+        pipe.expire(key, self.ttl)
+        pipe.delete(self._offered_key(order_id))
+        (status, task_id), *_ = pipe.execute()
+
+        return task_id if status == self.ACTIVE else None
+
+    def get_offered(self, order_id: int) -> Set[int]:
+        return {
+            int(telegram_id)
+            for telegram_id in self.client.smembers(self._offered_key(order_id))
+        }
+
+    def add_offered(self, order_id: int, telegram_ids: List[int]):
+        if not telegram_ids:
+            return
+
+        key = self._offered_key(order_id)
+        pipe = self.client.pipeline()
+        pipe.sadd(key, *telegram_ids)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+
+order_dispatch_state = OrderDispatchState()
+
+
+def start_order_dispatch(order_id: int):
+    """Запускает волновую рассылку заказа водителям."""
+    from web.apps.orders.tasks import dispatch_order_wave_task
+
+    order_dispatch_state.start(order_id)
+    dispatch_order_wave_task.delay(order_id, 0)
+
+
+def cancel_order_dispatch(order_id: int):
+    """Останавливает рассылку заказа и отменяет ожидающую волну."""
+    from web.core.celery import app
+
+    task_id = order_dispatch_state.finish(order_id)
+    if task_id:
+        app.control.revoke(task_id)
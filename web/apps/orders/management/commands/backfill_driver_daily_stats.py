@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from web.apps.orders.models import Order, DriverDailyStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневную статистику водителей по заказам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Та же выборка, что и в списке заказов за день
+        daily_stats = (
+            Order.objects.filter(driver_id__isnull=False, completed_at__isnull=False)
+            .annotate(date=TruncDate('created_at'))
+            .values('driver_id', 'date')
+            .annotate(
+                orders_count=Count('id'),
+                revenue=Sum('price'),
+                travel_length_km=Sum('travel_length_km'),
+                travel_time_minutes=Sum('travel_time_minutes'),
+            )
+            .order_by()
+        )
+
+        with transaction.atomic():
+            DriverDailyStats.objects.all().delete()
+            created_stats = DriverDailyStats.objects.bulk_create(
+                (DriverDailyStats(**stats) for stats in daily_stats.iterator()),
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {len(created_stats)} daily stats rows')
+        )
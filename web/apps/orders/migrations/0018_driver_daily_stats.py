@@ -0,0 +1,86 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:03
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+import web.db.models
+
+
+def backfill_driver_daily_stats(apps, schema_editor):
+    """
+    До появления completed_at в статистику попадали все заказы с водителем,
+    поэтому считаем их завершенными в момент создания и строим по ним сводку.
+    """
+    Order = apps.get_model('orders', 'Order')
+    DriverDailyStats = apps.get_model('orders', 'DriverDailyStats')
+
+    Order.objects.filter(
+        driver_id__isnull=False,
+        completed_at__isnull=True,
+    ).update(completed_at=F('created_at'))
+
+    daily_stats = (
+        Order.objects.filter(driver_id__isnull=False, completed_at__isnull=False)
+        .annotate(date=TruncDate('created_at'))
+        .values('driver_id', 'date')
+        .annotate(
+            orders_count=Count('id'),
+            revenue=Sum('price'),
+            travel_length_km=Sum('travel_length_km'),
+            travel_time_minutes=Sum('travel_time_minutes'),
+        )
+        .order_by()
+    )
+    DriverDailyStats.objects.bulk_create(
+        (DriverDailyStats(**stats) for stats in daily_stats.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_users', '0013_driver_review_aggregates'),
+        ('orders', '0017_alter_pointssettings_points_percent_for_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Количество заказов')),
+                ('revenue', web.db.models.PriceField(default=0, verbose_name='Выручка')),
+                ('travel_length_km', models.FloatField(default=0, verbose_name='Пройдено км')),
+                ('travel_time_minutes', models.PositiveIntegerField(default=0, verbose_name='Минут в пути')),
+            ],
+            options={
+                'verbose_name': 'Статистика водителя за день',
+                'verbose_name_plural': 'Статистика водителей по дням',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, default=None, null=True, verbose_name='Дата завершения'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['driver', 'created_at'], name='orders_orde_driver__3f274f_idx'),
+        ),
+        migrations.AddField(
+            model_name='driverdailystats',
+            name='driver',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='telegram_users.taxidriver', verbose_name='Водитель'),
+        ),
+        migrations.AddConstraint(
+            model_name='driverdailystats',
+            constraint=models.UniqueConstraint(fields=('driver', 'date'), name='unique_driver_daily_stats'),
+        ),
+        migrations.RunPython(
+            backfill_driver_daily_stats,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0018_driver_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='yookassa_payment_id',
+            field=models.CharField(db_index=True, default=None, editable=False, max_length=40, null=True, unique=True, verbose_name='Код платежа yookassa'),
+        ),
+    ]
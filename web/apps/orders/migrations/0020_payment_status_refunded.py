@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0019_payment_yookassa_payment_id_nullable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('Not paid', 'Не оплачен'), ('Paid', 'Оплачен'), ('Refunded', 'Возвращен')], default='Not paid', max_length=8, verbose_name='Статус'),
+        ),
+    ]
@@ -1,7 +1,13 @@
 from copy import copy
+from datetime import date
+from typing import Dict
 
+from asgiref.sync import sync_to_async
 from django.core.validators import MaxValueValidator
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from web.apps.telegram_users.models import TelegramUser
@@ -12,8 +18,46 @@ from web.db.model_mixins import (
     PriceMixin,
     SingletonModel
 )
+from web.db.base_manager import AsyncBaseManager
 from web.db.models import PriceField
-from web.services.api_2gis import api_2gis_service
+
+
+class OrderManager(AsyncBaseManager):
+    """Менеджер модели заказа"""
+
+    def _unassigned(self, order_id: int):
+        return self.filter(id=order_id, driver_id__isnull=True)
+
+    def assign_driver(self, order_id: int, driver_id: int) -> bool:
+        """
+        Назначает водителя, если заказ еще свободен.
+        Выполняется одним UPDATE ... WHERE driver_id IS NULL,
+        возвращает True, если водитель назначен этим вызовом.
+        """
+        return bool(self._unassigned(order_id).update(driver_id=driver_id))
+
+    async def aassign_driver(self, order_id: int, driver_id: int) -> bool:
+        return bool(await self._unassigned(order_id).aupdate(driver_id=driver_id))
+
+    @transaction.atomic
+    def complete(self, order_id: int) -> bool:
+        """
+        Завершает заказ и учитывает его в дневной статистике водителя.
+        Повторное завершение ничего не меняет и возвращает False.
+        """
+        is_completed = self.filter(
+            id=order_id,
+            driver_id__isnull=False,
+            completed_at__isnull=True,
+        ).update(completed_at=timezone.now())
+
+        if is_completed:
+            DriverDailyStats.objects.add_order(self.get(id=order_id))
+
+        return bool(is_completed)
+
+    async def acomplete(self, order_id: int) -> bool:
+        return await sync_to_async(self.complete)(order_id)
 
 
 class Order(AsyncBaseModel, TariffMixin, PriceMixin, TimestampMixin):
@@ -58,50 +102,129 @@ class Order(AsyncBaseModel, TariffMixin, PriceMixin, TimestampMixin):
         default=None,
         null=True,
     )
+    completed_at = models.DateTimeField(
+        _('Дата завершения'),
+        null=True,
+        blank=True,
+        default=None,
+    )
 
 
     updated_at = None # Исключаем updated_at
 
+    objects = OrderManager()
+
     class Meta:
         verbose_name = _('Заказ')
         verbose_name_plural = _('Заказы')
+        indexes = [
+            models.Index(fields=('driver', 'created_at')),
+        ]
 
     def __str__(self):
         return f'{self.from_address} - {self.to_address}'
 
-    def save(self, *args, **kwargs):
-        if not self._state.adding:
-            super().save(*args, **kwargs)
-            return
-
-        travel_length_meters, travel_time_seconds = api_2gis_service.get_route_distance_and_duration(
-            from_lat=self.from_latitude,
-            from_lon=self.from_longitude,
-            to_lat=self.to_latitude,
-            to_lon=self.to_longitude,
-        )
-        self.travel_length_km = travel_length_meters / 1000
-        self.travel_time_minutes = round(travel_time_seconds / 60)
-        self.price = self.calculate_price()
-
-        super().save(*args, **kwargs)
-
-    def calculate_price(self):
-        price_settings: OrderPriceSettings = OrderPriceSettings.load()
+    @staticmethod
+    def calculate_route_price(
+            travel_length_km: float,
+            travel_time_minutes: int,
+            tariff: str,
+            price_settings: 'OrderPriceSettings',
+    ) -> int:
         default_order_price = price_settings.default_order_price
 
-        if self.telegram_user.tariff == TelegramUser.URGENT:
+        if tariff == TelegramUser.URGENT:
             default_order_price += default_order_price * 0.27 # + 27%
 
         price = int(
             default_order_price + (
-                price_settings.price_for_km * self.travel_length_km +
-                price_settings.price_for_travel_minute * self.travel_time_minutes
+                price_settings.price_for_km * travel_length_km +
+                price_settings.price_for_travel_minute * travel_time_minutes
             )
         )
         return price
 
 
+class DriverDailyStatsManager(AsyncBaseManager):
+    """Менеджер дневной статистики водителей"""
+
+    def add_order(self, order: Order):
+        """Прибавляет завершенный заказ к статистике за день его создания"""
+        stats_filter = dict(
+            driver_id=order.driver_id,
+            date=timezone.localdate(order.created_at),
+        )
+        increments = dict(
+            orders_count=F('orders_count') + 1,
+            revenue=F('revenue') + order.price,
+            travel_length_km=F('travel_length_km') + order.travel_length_km,
+            travel_time_minutes=F('travel_time_minutes') + order.travel_time_minutes,
+        )
+
+        if self.filter(**stats_filter).update(**increments):
+            return
+
+        try:
+            with transaction.atomic():
+                self.create(
+                    **stats_filter,
+                    orders_count=1,
+                    revenue=order.price,
+                    travel_length_km=order.travel_length_km,
+                    travel_time_minutes=order.travel_time_minutes,
+                )
+        except IntegrityError:
+            # Строку за этот день успел создать параллельный запрос
+            self.filter(**stats_filter).update(**increments)
+
+    async def aget_summary(
+            self,
+            driver_id: int,
+            date_from: date,
+            date_to: date,
+    ) -> Dict:
+        """Возвращает суммарную статистику водителя за период включительно"""
+        return await self.filter(
+            driver_id=driver_id,
+            date__range=(date_from, date_to),
+        ).aaggregate(
+            orders_count=Coalesce(Sum('orders_count'), 0),
+            revenue=Coalesce(Sum('revenue'), 0.0),
+            travel_length_km=Coalesce(Sum('travel_length_km'), 0.0),
+            travel_time_minutes=Coalesce(Sum('travel_time_minutes'), 0),
+        )
+
+
+class DriverDailyStats(AsyncBaseModel):
+    """Модель статистики водителя за день по завершенным заказам"""
+    driver = models.ForeignKey(
+        'telegram_users.TaxiDriver',
+        related_name='daily_stats',
+        on_delete=models.CASCADE,
+        verbose_name=_('Водитель'),
+    )
+    date = models.DateField(_('Дата'))
+    orders_count = models.PositiveIntegerField(_('Количество заказов'), default=0)
+    revenue = PriceField(_('Выручка'), default=0)
+    travel_length_km = models.FloatField(_('Пройдено км'), default=0)
+    travel_time_minutes = models.PositiveIntegerField(_('Минут в пути'), default=0)
+
+    objects = DriverDailyStatsManager()
+
+    class Meta:
+        verbose_name = _('Статистика водителя за день')
+        verbose_name_plural = _('Статистика водителей по дням')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('driver', 'date'),
+                name='unique_driver_daily_stats',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.driver_id}: {self.date}'
+
+
 class Payment(AsyncBaseModel, PriceMixin, TimestampMixin):
     """Модель оплаты"""
     TAXI = 'Taxi'
@@ -116,10 +239,12 @@ class Payment(AsyncBaseModel, PriceMixin, TimestampMixin):
 
     NOT_PAID = 'Not paid'
     PAID = 'Paid'
+    REFUNDED = 'Refunded'
 
     STATUS_CHOICES = (
         (NOT_PAID, _('Не оплачен')),
-        (PAID, _('Оплачен'))
+        (PAID, _('Оплачен')),
+        (REFUNDED, _('Возвращен')),
     )
 
     yookassa_payment_id = models.CharField(
@@ -128,6 +253,8 @@ class Payment(AsyncBaseModel, PriceMixin, TimestampMixin):
         editable=False,
         unique=True,
         max_length=40,
+        null=True,
+        default=None,
     )
     type = models.CharField(
         _('Тип оплаты'),
@@ -1,51 +1,106 @@
-import asyncio
+from typing import List, Set
 
 from celery import shared_task
 from django.conf import settings
-from django.db.models import Q
+from django.db import transaction
+from loguru import logger
+from yookassa import Payment as YooKassaPayment
 
 from bot.utils.texts import get_order_info_message
-from web.apps.orders.models import Order
+from web.apps.orders.dispatch import order_dispatch_state
+from web.apps.orders.models import Order, Payment
+from web.apps.products.models import Product, ProductReservation
 from web.apps.telegram_users.models import TaxiDriver, TelegramUser
+from web.services.driver_locations import driver_location_index
+from web.services.rate_limit import Priority
 from web.services.telegram import telegram_service, async_telegram_service
+from web.services.yookassa import RETRYABLE_ERRORS, create_yookassa_refund
+from web.utils.event_loop import run_async
 
 
-@shared_task(ignore_result=True)
-def send_order_to_active_drivers_task(order_id: Order.id):
-    """"Задача для отправки заказа всем активным водителям"""
-    order: Order = Order.objects.get(id=order_id)
-    order_telegram_user: TelegramUser = TelegramUser.objects.get(id=order.telegram_user_id)
-
-    active_drivers = TaxiDriver.objects.filter(
-        ~Q(telegram_id=order_telegram_user.telegram_id),
-        is_active=True
+def get_nearest_driver_ids(
+        order: Order,
+        radius_km: float,
+        count: int,
+        exclude_telegram_ids: Set[int],
+) -> List[int]:
+    """Возвращает telegram_id ближайших к точке подачи активных водителей"""
+    nearby_drivers = driver_location_index.search(
+        lat=order.from_latitude,
+        lon=order.from_longitude,
+        radius_km=radius_km,
+    )
+    nearby_driver_ids = [
+        telegram_id for telegram_id, _ in nearby_drivers
+        if telegram_id not in exclude_telegram_ids
+    ]
+    active_driver_ids = set(
+        TaxiDriver.objects.filter(
+            telegram_id__in=nearby_driver_ids,
+            is_active=True,
+        ).values_list('telegram_id', flat=True)
     )
-    order_message = 'Поступил новый заказ!\n\n' + get_order_info_message(order)
-    take_order_button = {'text': 'Взять ✅'}
 
-    if not active_drivers.exists():
-        take_order_button['callback_data'] = f'channel_take_order_{order.id}'
-        telegram_service.send_message(
-            chat_id=settings.PRIVATE_TAXI_ORDERS_CHANNEL_ID,
-            text=order_message,
-            reply_markup={'inline_keyboard': [[take_order_button]]}
-        )
+    # Список отсортирован по удаленности от точки подачи
+    return [
+        telegram_id for telegram_id in nearby_driver_ids
+        if telegram_id in active_driver_ids
+    ][:count]
+
+
+@shared_task(ignore_result=True)
+def dispatch_order_wave_task(order_id: Order.id, wave: int):
+    """"Задача для рассылки заказа очередной волне ближайших водителей"""
+    if not order_dispatch_state.claim_wave(order_id, wave):
         return
 
-    for taxi_driver in active_drivers:
-        take_order_button['callback_data'] = f'take_order_{order.id}'
-        miss_order_button = {'text': 'Пропустить ❌', 'callback_data': f'miss_order_{order.id}'}
-        inline_keyboard = [[take_order_button, miss_order_button]]
+    order: Order = Order.objects.select_related('telegram_user').get(id=order_id)
+
+    if order.driver_id:
+        order_dispatch_state.finish(order_id)
+        return
+
+    if wave >= len(order_dispatch_state.waves):
+        send_order_private_channel_task(order_id)
+        order_dispatch_state.finish(order_id)
+        return
+
+    radius_km, drivers_count, timeout_seconds = order_dispatch_state.waves[wave]
+    driver_ids = get_nearest_driver_ids(
+        order=order,
+        radius_km=radius_km,
+        count=drivers_count,
+        exclude_telegram_ids={
+            order.telegram_user.telegram_id,
+            *order_dispatch_state.get_offered(order_id),
+        },
+    )
+
+    if driver_ids:
+        order_dispatch_state.add_offered(order_id, driver_ids)
 
-        asyncio.run(
-            async_telegram_service.send_message(
-                chat_id=taxi_driver.telegram_id,
+        order_message = 'Поступил новый заказ!\n\n' + get_order_info_message(order)
+        inline_keyboard = [[
+            {'text': 'Взять ✅', 'callback_data': f'take_order_{order.id}'},
+            {'text': 'Пропустить ❌', 'callback_data': f'miss_order_{order.id}'},
+        ]]
+
+        run_async(
+            async_telegram_service.broadcast_message(
+                chat_ids=driver_ids,
                 text=order_message,
-                reply_markup={
-                    'inline_keyboard': inline_keyboard}
+                reply_markup={'inline_keyboard': inline_keyboard},
+                priority=Priority.HIGH,
             )
         )
 
+    # Если в радиусе волны никого нет, сразу переходим к следующей
+    next_wave = dispatch_order_wave_task.apply_async(
+        args=(order_id, wave + 1),
+        countdown=timeout_seconds if driver_ids else 0,
+    )
+    order_dispatch_state.set_pending_task(order_id, next_wave.id)
+
 
 @shared_task(ignore_result=True)
 def send_order_private_channel_task(order_id: Order.id):
@@ -63,6 +118,175 @@ def send_order_private_channel_task(order_id: Order.id):
     telegram_service.send_message(
         chat_id=settings.PRIVATE_TAXI_ORDERS_CHANNEL_ID,
         text=order_message,
-        reply_markup={'inline_keyboard': inline_keyboard}
+        reply_markup={'inline_keyboard': inline_keyboard},
+        priority=Priority.HIGH,
+    )
+
+
+@shared_task(
+    ignore_result=True,
+    autoretry_for=RETRYABLE_ERRORS,
+    retry_backoff=True,
+    max_retries=5,
+)
+def process_succeeded_payment_task(
+        yookassa_payment_id: str,
+        notify_not_paid: bool = False,
+):
+    """
+    Задача для подтверждения оплаты по уведомлению YooKassa
+    или по возвращению пользователя в бота.
+    """
+    payment = Payment.objects.select_related('telegram_user').filter(
+        yookassa_payment_id=yookassa_payment_id
+    ).first()
+
+    if payment is None:
+        logger.warning(f'Payment {yookassa_payment_id} not found')
+        return
+
+    if payment.status != Payment.NOT_PAID:
+        return
+
+    # Уведомление только сигнал, статус платежа берем из API
+    yookassa_payment = YooKassaPayment.find_one(yookassa_payment_id)
+    if not yookassa_payment.paid:
+        if notify_not_paid and payment.telegram_user is not None:
+            telegram_service.send_message(
+                chat_id=payment.telegram_user.telegram_id,
+                text='Оплата не выполнена',
+            )
+        return
+
+    metadata = dict(yookassa_payment.metadata or {})
+
+    with transaction.atomic():
+        # YooKassa может прислать уведомление несколько раз,
+        # баллы начисляет только тот, кто первым сменил статус
+        is_updated = Payment.objects.filter(
+            id=payment.id,
+            status=Payment.NOT_PAID,
+        ).update(status=Payment.PAID)
+
+        if not is_updated:
+            return
+
+        # Резерв мог истечь до оплаты, а товар закончиться.
+        # Тогда баллы не начисляем, а деньги возвращаем
+        if payment.product_id and not ProductReservation.objects.confirm(payment.id):
+            transaction.on_commit(
+                lambda: refund_out_of_stock_payment_task.delay(
+                    payment.id, int(metadata.get('written_off_points', 0))
+                )
+            )
+            return
+
+        TelegramUser.objects.add_points(
+            payment.telegram_user_id,
+            int(metadata.get('points', 0)),
+            payment_id=payment.id,
+        )
+        transaction.on_commit(
+            lambda: send_successful_payment_messages_task.delay(
+                payment.id, metadata
+            )
+        )
+
+
+@shared_task(
+    ignore_result=True,
+    autoretry_for=RETRYABLE_ERRORS,
+    retry_backoff=True,
+    max_retries=5,
+)
+def refund_out_of_stock_payment_task(
+        payment_id: Payment.id,
+        written_off_points: int = 0,
+):
+    """"Задача для возврата денег и баллов за товар, которого не осталось на складе"""
+    payment: Payment = Payment.objects.select_related(
+        'telegram_user'
+    ).get(id=payment_id)
+
+    if payment.status != Payment.PAID:
+        return
+
+    # Ключ идемпотентности не даст вернуть деньги дважды при повторе задачи
+    create_yookassa_refund(
+        db_payment_id=payment.id,
+        yookassa_payment_id=payment.yookassa_payment_id,
+        amount=payment.price,
+        description='Товар закончился',
+    )
+    with transaction.atomic():
+        is_updated = Payment.objects.filter(
+            id=payment.id,
+            status=Payment.PAID,
+        ).update(status=Payment.REFUNDED)
+
+        if not is_updated or payment.telegram_user is None:
+            return
+
+        if written_off_points:
+            TelegramUser.objects.refund_points(
+                payment.telegram_user_id,
+                written_off_points,
+                payment_id=payment.id,
+            )
+
+    text = (
+        'К сожалению, пока проходила оплата, товар закончился 😔\n'
+        f'Платеж на сумму {int(payment.price)} руб. будет возвращен.'
     )
+    if written_off_points:
+        text += f'\nСписанные баллы ({written_off_points}) вернули на счет.'
 
+    telegram_service.send_message(
+        chat_id=payment.telegram_user.telegram_id,
+        text=text,
+        priority=Priority.HIGH,
+    )
+
+
+@shared_task(ignore_result=True)
+def send_successful_payment_messages_task(payment_id: Payment.id, metadata: dict):
+    """"Задача для уведомлений об успешной оплате"""
+    payment: Payment = Payment.objects.select_related(
+        'telegram_user'
+    ).get(id=payment_id)
+    text = f'Платеж на сумму {int(payment.price)} руб. прошел успешно ✅\n'
+
+    if metadata.get('type') == 'order':
+        text += 'Ожидайте водителя.'
+        order: Order = Order.objects.select_related('driver').get(
+            id=payment.order_id
+        )
+        inline_keyboard = [[
+            {'text': 'Завершить заказ', 'callback_data': f'end_order_{order.id}'},
+        ]]
+
+        telegram_service.send_message(
+            chat_id=order.driver.telegram_id,
+            text=(
+                '<b>Заявка на заказ одобренна! Заказ активен ✅.</b>\n\n'
+                + get_order_info_message(order)
+            ),
+            reply_markup={'inline_keyboard': inline_keyboard},
+            priority=Priority.HIGH,
+        )
+    elif metadata.get('type') == 'product':
+        text += 'Ожидайте доставку.'
+        product: Product = Product.objects.get(id=payment.product_id)
+
+        telegram_service.send_message(
+            chat_id=settings.PRIVATE_PRODUCTS_ORDERS_CHANNEL_ID,
+            text=f'Доставка товара <b>{product.name}</b>\n\n'
+                 f'Адрес: <b>{metadata["address"]}</b>\n'
+                 f'Телефон получателя: <b><em>{metadata["phone_number"]}</em></b>',
+        )
+
+    telegram_service.send_message(
+        chat_id=payment.telegram_user.telegram_id,
+        text=text,
+        priority=Priority.HIGH,
+    )
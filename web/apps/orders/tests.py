@@ -0,0 +1,129 @@
+from datetime import timedelta
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.test import TestCase
+from django.utils import timezone
+from yookassa.domain.exceptions import InternalServerError
+
+from web.apps.orders.models import Payment
+from web.apps.orders.tasks import (
+    process_succeeded_payment_task,
+    refund_out_of_stock_payment_task,
+)
+from web.apps.products.models import Product, ProductReservation
+from web.apps.telegram_users.models import PointsTransaction, TelegramUser
+
+
+class ProcessSucceededPaymentTaskTest(TestCase):
+    def setUp(self):
+        self.telegram_user = TelegramUser.objects.create(telegram_id=1)
+        self.product = Product.objects.create(
+            name='Товар',
+            description='Описание',
+            price=100,
+            quantity=0,
+        )
+        self.payment = Payment.objects.create(
+            yookassa_payment_id='yookassa-1',
+            type=Payment.PRODUCT,
+            price=100,
+            product=self.product,
+            telegram_user=self.telegram_user,
+        )
+
+    @mock.patch('web.apps.orders.tasks.YooKassaPayment.find_one')
+    def test_retry_on_yookassa_server_error(self, find_one):
+        find_one.side_effect = InternalServerError({'code': 'internal_server_error'})
+
+        with mock.patch.object(
+            process_succeeded_payment_task, 'retry', side_effect=Retry
+        ) as retry:
+            with self.assertRaises(Retry):
+                process_succeeded_payment_task('yookassa-1')
+
+        retry.assert_called_once()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.NOT_PAID)
+
+    @mock.patch('web.apps.orders.tasks.telegram_service.send_message')
+    @mock.patch('web.apps.orders.tasks.YooKassaPayment.find_one')
+    def test_notify_not_paid_on_user_return(self, find_one, send_message):
+        find_one.return_value = mock.Mock(paid=False, metadata={})
+
+        process_succeeded_payment_task('yookassa-1', notify_not_paid=True)
+
+        send_message.assert_called_once_with(
+            chat_id=self.telegram_user.telegram_id,
+            text='Оплата не выполнена',
+        )
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.NOT_PAID)
+
+    def process_out_of_stock_payment(self, metadata: dict):
+        """Проводит оплату товара, резерв которого истек, а товар закончился"""
+        ProductReservation.objects.create(
+            product=self.product,
+            payment=self.payment,
+            status=ProductReservation.RELEASED,
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+
+        with mock.patch(
+            'web.apps.orders.tasks.YooKassaPayment.find_one',
+            return_value=mock.Mock(paid=True, metadata=metadata),
+        ), mock.patch(
+            'web.apps.orders.tasks.create_yookassa_refund',
+        ) as create_refund, mock.patch(
+            'web.apps.orders.tasks.telegram_service.send_message',
+        ) as send_message, mock.patch(
+            'web.apps.orders.tasks.refund_out_of_stock_payment_task.delay',
+            side_effect=refund_out_of_stock_payment_task,
+        ), mock.patch(
+            'web.apps.orders.tasks.send_successful_payment_messages_task.delay',
+        ) as send_successful_messages:
+            with self.captureOnCommitCallbacks(execute=True):
+                process_succeeded_payment_task('yookassa-1')
+
+        send_successful_messages.assert_not_called()
+        create_refund.assert_called_once_with(
+            db_payment_id=self.payment.id,
+            yookassa_payment_id='yookassa-1',
+            amount=100,
+            description='Товар закончился',
+        )
+        send_message.assert_called_once()
+        self.assertEqual(
+            send_message.call_args.kwargs['chat_id'],
+            self.telegram_user.telegram_id,
+        )
+
+        self.payment.refresh_from_db()
+        self.telegram_user.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.REFUNDED)
+
+    def test_refund_when_reservation_expired_and_out_of_stock(self):
+        points = self.telegram_user.points
+
+        self.process_out_of_stock_payment({'type': 'product', 'points': 10})
+
+        self.assertEqual(self.telegram_user.points, points)
+
+    def test_refund_written_off_points_when_out_of_stock(self):
+        points = self.telegram_user.points
+        TelegramUser.objects.write_off_points(self.telegram_user.id, 50)
+
+        # YooKassa возвращает значения metadata строками
+        self.process_out_of_stock_payment(
+            {'type': 'product', 'points': 10, 'written_off_points': '50'}
+        )
+
+        self.assertEqual(self.telegram_user.points, points)
+        self.assertTrue(
+            PointsTransaction.objects.filter(
+                telegram_user=self.telegram_user,
+                type=PointsTransaction.REFUND,
+                amount=50,
+                payment=self.payment,
+            ).exists()
+        )
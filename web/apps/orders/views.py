@@ -0,0 +1,56 @@
+import ipaddress
+import json
+
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from loguru import logger
+from yookassa.domain.common import SecurityHelper
+from yookassa.domain.notification import (
+    WebhookNotificationEventType,
+    WebhookNotificationFactory,
+)
+
+from web.apps.orders.tasks import process_succeeded_payment_task
+
+
+def get_client_ip(request: HttpRequest) -> str:
+    # nginx передает адрес клиента в X-Real-IP
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR', '')
+
+
+def is_yookassa_ip(ip: str) -> bool:
+    try:
+        ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+
+    return SecurityHelper().is_ip_trusted(ip)
+
+
+@csrf_exempt
+@require_POST
+def yookassa_webhook_view(request: HttpRequest) -> HttpResponse:
+    """
+    Принимает уведомления YooKassa о платежах.
+
+    Обработка платежа вынесена в Celery, чтобы быстро ответить YooKassa.
+    При ответе не 200 YooKassa повторяет отправку уведомления.
+    """
+    ip = get_client_ip(request)
+    if not is_yookassa_ip(ip):
+        logger.warning(f'YooKassa notification from untrusted ip {ip}')
+        return HttpResponse(status=403)
+
+    try:
+        notification = WebhookNotificationFactory().create(
+            json.loads(request.body)
+        )
+    except (ValueError, TypeError) as e:
+        logger.warning(f'Invalid YooKassa notification: {e}')
+        return HttpResponse(status=400)
+
+    if notification.event == WebhookNotificationEventType.PAYMENT_SUCCEEDED:
+        process_succeeded_payment_task.delay(notification.object.id)
+
+    return HttpResponse()
@@ -1,8 +1,20 @@
 from django.contrib import admin
 
-from web.apps.products.models import Product
+from web.admin.mixins import NotAllowedToChangeMixin, NotAllowedToAddMixin
+from web.apps.products.models import Product, ProductReservation
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    pass
\ No newline at end of file
+    pass
+
+
+@admin.register(ProductReservation)
+class ProductReservationAdmin(
+    NotAllowedToChangeMixin,
+    NotAllowedToAddMixin,
+    admin.ModelAdmin,
+):
+    list_display = ('product', 'payment', 'status', 'expires_at')
+    list_filter = ('status', )
+    list_select_related = ('product', 'payment')
\ No newline at end of file
@@ -0,0 +1,84 @@
+from typing import Optional
+
+import redis
+from django.conf import settings
+from loguru import logger
+
+from web.apps.products.models import Product
+from web.services.cache import TwoTierCache, MISSING
+from web.services.redis import redis_client, get_async_redis_client
+from web.utils.pagination import QuerySetPaginator
+
+
+class ProductCatalogCache:
+    """
+    Кэш страниц каталога товаров.
+
+    Ключ страницы содержит версию каталога из Redis. При изменении товаров
+    версия увеличивается, и все закэшированные страницы перестают читаться.
+    """
+    VERSION_KEY = 'products:catalog:version'
+
+    def __init__(
+            self,
+            ttl: int = settings.PRODUCT_CATALOG_CACHE_TTL,
+            client: redis.Redis = redis_client,
+    ):
+        self.cache = TwoTierCache(
+            namespace='products:catalog',
+            ttl=ttl,
+            local_maxsize=256,
+            client=client,
+        )
+        self.client = client
+
+    @staticmethod
+    def get_queryset():
+        return Product.objects.order_by('id').values_list('id', 'name')
+
+    def invalidate(self):
+        try:
+            self.client.incr(self.VERSION_KEY)
+        except redis.RedisError as e:
+            logger.warning(f'Failed to invalidate product catalog cache: {e}')
+
+    async def aget_version(self) -> Optional[str]:
+        try:
+            return await get_async_redis_client().get(self.VERSION_KEY) or '0'
+        except redis.RedisError as e:
+            logger.warning(f'Failed to get product catalog version: {e}')
+            return None
+
+    async def aget_page(
+            self,
+            page_number: int,
+            per_page: int,
+    ) -> QuerySetPaginator:
+        """Возвращает пагинатор с загруженной страницей (id, название) товаров."""
+        paginator = QuerySetPaginator(
+            self.get_queryset(),
+            page_number=page_number,
+            per_page=per_page,
+        )
+
+        version = await self.aget_version()
+        if version is None:
+            await paginator.aload()
+            return paginator
+
+        key = f'{version}:{per_page}:{paginator.page_number}'
+        page = await self.cache.aget(key)
+        if page is not MISSING:
+            paginator.set_page(page['products'], page['has_next'])
+            return paginator
+
+        products = await paginator.aload()
+        await self.cache.aset(
+            key,
+            {'products': products, 'has_next': paginator.has_next()},
+        )
+
+        return paginator
+
+
+product_catalog_cache = ProductCatalogCache()
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0019_payment_yookassa_payment_id_nullable'),
+        ('products', '0004_product_quantity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Reserved', 'Зарезервирован'), ('Confirmed', 'Оплачен'), ('Released', 'Снят')], default='Reserved', max_length=9, verbose_name='Статус')),
+                ('expires_at', models.DateTimeField(verbose_name='Действует до')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('payment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='product_reservation', to='orders.payment', verbose_name='Оплата')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Резерв товара',
+                'verbose_name_plural': 'Резервы товаров',
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='products_pr_status_94fdde_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,14 @@
-from django.db import models
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from loguru import logger
+
+from web.db.base_manager import AsyncBaseManager
 from web.db.model_mixins import (
     AsyncBaseModel,
     TimestampMixin,
@@ -7,6 +16,25 @@ from web.db.model_mixins import (
 )
 
 
+class ProductManager(AsyncBaseManager):
+    """
+    Менеджер товаров.
+
+    Остаток меняется только условными UPDATE с F() выражениями,
+    без чтения и сохранения всей строки товара.
+    """
+
+    def take_stock(self, product_id: int, count: int = 1) -> bool:
+        """Уменьшает остаток, если товара достаточно."""
+        return bool(
+            self.filter(id=product_id, quantity__gte=count)
+            .update(quantity=F('quantity') - count)
+        )
+
+    def return_stock(self, product_id: int, count: int = 1):
+        self.filter(id=product_id).update(quantity=F('quantity') + count)
+
+
 class Product(AsyncBaseModel, PriceMixin, TimestampMixin):
     """Модель товара"""
 
@@ -14,6 +42,8 @@ class Product(AsyncBaseModel, PriceMixin, TimestampMixin):
     description = models.TextField(_('Описание'), max_length=4000)
     quantity = models.PositiveBigIntegerField(_('Количество'), default=0)
 
+    objects = ProductManager()
+
     class Meta:
         verbose_name = _('Товар')
         verbose_name_plural = _('Товары')
@@ -22,3 +52,145 @@ class Product(AsyncBaseModel, PriceMixin, TimestampMixin):
         return self.name
 
 
+class ProductReservationManager(AsyncBaseManager):
+    """
+    Менеджер резервов товара.
+
+    Резерв списывает единицу товара со склада до оплаты.
+    Если оплата не подтверждена за PRODUCT_RESERVATION_TTL_MINUTES,
+    резерв снимается и товар возвращается на склад.
+    """
+
+    @transaction.atomic
+    def reserve(self, product_id: int, payment_id: int) -> bool:
+        """Резервирует товар под платеж. Возвращает False, если товара нет."""
+        if not Product.objects.take_stock(product_id):
+            return False
+
+        self.create(
+            product_id=product_id,
+            payment_id=payment_id,
+            expires_at=timezone.now() + timedelta(
+                minutes=settings.PRODUCT_RESERVATION_TTL_MINUTES
+            ),
+        )
+        return True
+
+    @transaction.atomic
+    def confirm(self, payment_id: int) -> bool:
+        """
+        Подтверждает резерв оплаченного платежа.
+
+        Если резерв уже снят по истечении срока, товар списывается
+        повторно. Возвращает False, если товара на складе не осталось.
+        """
+        reservation = (
+            self.select_for_update()
+            .filter(payment_id=payment_id)
+            .first()
+        )
+        if reservation is None or reservation.status == ProductReservation.CONFIRMED:
+            return True
+
+        if reservation.status == ProductReservation.RELEASED:
+            if not Product.objects.take_stock(reservation.product_id):
+                logger.warning(
+                    f'Product {reservation.product_id} is out of stock '
+                    f'for paid payment {payment_id}'
+                )
+                return False
+
+        reservation.status = ProductReservation.CONFIRMED
+        reservation.save(update_fields=('status',))
+        return True
+
+    @transaction.atomic
+    def release(self, payment_id: int):
+        """Снимает активный резерв платежа и возвращает товар на склад."""
+        reservation = (
+            self.select_for_update()
+            .filter(payment_id=payment_id, status=ProductReservation.RESERVED)
+            .first()
+        )
+        if reservation is None:
+            return
+
+        reservation.status = ProductReservation.RELEASED
+        reservation.save(update_fields=('status',))
+        Product.objects.return_stock(reservation.product_id)
+
+    def release_expired(self, chunk_size: int) -> int:
+        """
+        Снимает одну пачку просроченных резервов.
+        Возвращает количество снятых резервов.
+        """
+        with transaction.atomic():
+            reservations = list(
+                self.filter(
+                    status=ProductReservation.RESERVED,
+                    expires_at__lte=timezone.now(),
+                )
+                .order_by('id')
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'product_id')[:chunk_size]
+            )
+            if not reservations:
+                return 0
+
+            self.filter(
+                id__in=[reservation_id for reservation_id, _ in reservations]
+            ).update(status=ProductReservation.RELEASED)
+
+            products_count = Counter(
+                product_id for _, product_id in reservations
+            )
+            for product_id, count in products_count.items():
+                Product.objects.return_stock(product_id, count)
+
+        return len(reservations)
+
+
+class ProductReservation(AsyncBaseModel):
+    """Модель резерва товара под платеж"""
+    RESERVED = 'Reserved'
+    CONFIRMED = 'Confirmed'
+    RELEASED = 'Released'
+
+    STATUS_CHOICES = (
+        (RESERVED, _('Зарезервирован')),
+        (CONFIRMED, _('Оплачен')),
+        (RELEASED, _('Снят')),
+    )
+
+    product = models.ForeignKey(
+        'products.Product',
+        related_name='reservations',
+        on_delete=models.CASCADE,
+        verbose_name=_('Товар'),
+    )
+    payment = models.OneToOneField(
+        'orders.Payment',
+        related_name='product_reservation',
+        on_delete=models.CASCADE,
+        verbose_name=_('Оплата'),
+    )
+    status = models.CharField(
+        _('Статус'),
+        choices=STATUS_CHOICES,
+        max_length=9,
+        default=RESERVED,
+    )
+    expires_at = models.DateTimeField(_('Действует до'))
+    created_at = models.DateTimeField(_('Дата создания'), auto_now_add=True)
+
+    objects = ProductReservationManager()
+
+    class Meta:
+        verbose_name = _('Резерв товара')
+        verbose_name_plural = _('Резервы товаров')
+        indexes = [
+            models.Index(fields=('status', 'expires_at')),
+        ]
+
+    def __str__(self):
+        return f'{self.product}: {self.get_status_display()}'
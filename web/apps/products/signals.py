@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from web.apps.products.catalog import product_catalog_cache
+from web.apps.products.models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance: Product, **kwargs):
+    transaction.on_commit(product_catalog_cache.invalidate)
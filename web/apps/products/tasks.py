@@ -0,0 +1,23 @@
+from celery import shared_task
+from django.conf import settings
+from loguru import logger
+
+from web.apps.products.models import ProductReservation
+
+
+@shared_task(ignore_result=True)
+def release_expired_product_reservations_task(
+        chunk_size: int = settings.PRODUCT_RESERVATION_RELEASE_CHUNK_SIZE,
+):
+    """
+    Задача для снятия резервов товаров, оплата которых не подтверждена.
+
+    Резервы снимаются пачками по chunk_size в отдельных транзакциях,
+    товар возвращается на склад одним UPDATE на каждый товар пачки.
+    """
+    released_count = 0
+    while count := ProductReservation.objects.release_expired(chunk_size):
+        released_count += count
+
+    if released_count:
+        logger.info(f'Released {released_count} expired product reservations')
@@ -4,11 +4,13 @@ from .models import (
     TelegramUser,
     TaxiDriver,
     Car,
-    TariffDriverRequest
+    TariffDriverRequest,
+    PointsTransaction
 )
 from ...admin.mixins import (
     NotAllowedToChangeMixin,
-    NotAllowedToAddMixin
+    NotAllowedToAddMixin,
+    TelegramMediaAdminMixin,
 )
 
 
@@ -21,13 +23,38 @@ class TelegramUserAdmin(
     exclude = ('last_add_points_date', )
 
 
+@admin.register(PointsTransaction)
+class PointsTransactionAdmin(
+    NotAllowedToChangeMixin,
+    NotAllowedToAddMixin,
+    admin.ModelAdmin,
+):
+    list_display = ('telegram_user', 'type', 'amount', 'created_at')
+    list_filter = ('type', )
+    list_select_related = ('telegram_user', )
+
+
 
 @admin.register(TaxiDriver)
-class TaxiDriverAdmin(admin.ModelAdmin):
+class TaxiDriverAdmin(TelegramMediaAdminMixin, admin.ModelAdmin):
     list_filter = ('is_active', 'tariff')
+    telegram_media_fields = {'passport_photo': 'passport_photo_file_id'}
 
-    readonly_fields = ('rating_display', )
-    exclude = ('rating', 'reviews',)
+    readonly_fields = (
+        'passport_photo_display',
+        'rating_display',
+        'reviews_count',
+        'stars_5_count',
+        'stars_4_count',
+        'stars_3_count',
+        'stars_2_count',
+        'stars_1_count',
+    )
+    exclude = ('rating', 'reviews_sum',)
+
+    @admin.display(description='Фото паспорта')
+    def passport_photo_display(self, obj):
+        return self.photo_html(obj, 'passport_photo')
 
     @admin.display(description='Оценка')
     def rating_display(self, obj):
@@ -41,21 +68,40 @@ class TaxiDriverAdmin(admin.ModelAdmin):
 
 
 @admin.register(Car)
-class CarAdmin(NotAllowedToAddMixin, admin.ModelAdmin):
+class CarAdmin(TelegramMediaAdminMixin, NotAllowedToAddMixin, admin.ModelAdmin):
+    list_display = ('name', 'driver', 'status', 'front_photo_thumbnail')
     list_filter = ('status',)
+    list_select_related = ('driver', )
+    telegram_media_fields = {
+        'front_photo': 'front_photo_file_id',
+        'profile_photo': 'profile_photo_file_id',
+    }
 
     readonly_fields = (
         'driver',
         'name',
         'gos_number',
         'vin',
-        'front_photo',
-        'profile_photo',
+        'front_photo_display',
+        'profile_photo_display',
     )
+    exclude = ('front_photo', 'profile_photo')
     search_fields = (
         'name__iregex',
     )
 
+    @admin.display(description='Фото')
+    def front_photo_thumbnail(self, obj: Car):
+        return self.photo_html(obj, 'front_photo', thumbnail=True)
+
+    @admin.display(description='Фото спереди')
+    def front_photo_display(self, obj: Car):
+        return self.photo_html(obj, 'front_photo')
+
+    @admin.display(description='Фото сбоку')
+    def profile_photo_display(self, obj: Car):
+        return self.photo_html(obj, 'profile_photo')
+
     def has_change_permission(self, request, obj: Car | None = None):
         if not obj or obj.status == Car.WAITING:
             return True
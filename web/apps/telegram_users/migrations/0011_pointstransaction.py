@@ -0,0 +1,56 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_initial_points_transactions(apps, schema_editor):
+    """Переносит текущие балансы в журнал операций"""
+    TelegramUser = apps.get_model('telegram_users', 'TelegramUser')
+    PointsTransaction = apps.get_model('telegram_users', 'PointsTransaction')
+
+    batch = []
+    for telegram_user_id, points in TelegramUser.objects.filter(
+        points__gt=0
+    ).values_list('id', 'points').iterator(chunk_size=2000):
+        batch.append(PointsTransaction(
+            telegram_user_id=telegram_user_id,
+            amount=points,
+            type='Initial',
+        ))
+
+        if len(batch) >= 2000:
+            PointsTransaction.objects.bulk_create(batch)
+            batch = []
+
+    PointsTransaction.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0017_alter_pointssettings_points_percent_for_product'),
+        ('telegram_users', '0010_remove_telegramuser_rating_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('amount', models.BigIntegerField(verbose_name='Количество баллов')),
+                ('type', models.CharField(choices=[('Initial', 'Начальный баланс'), ('Accrual', 'Начисление'), ('Write-off', 'Списание'), ('Expiration', 'Сгорание')], max_length=15, verbose_name='Тип операции')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_transactions', to='orders.payment', verbose_name='Оплата')),
+                ('telegram_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_transactions', to='telegram_users.telegramuser', verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Операция с баллами',
+                'verbose_name_plural': 'Операции с баллами',
+            },
+        ),
+        migrations.RunPython(
+            create_initial_points_transactions,
+            migrations.RunPython.noop,
+        ),
+    ]
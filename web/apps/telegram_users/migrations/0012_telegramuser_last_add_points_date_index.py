@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:01
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_users', '0011_pointstransaction'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='last_add_points_date',
+            field=models.DateField(db_index=True, default=datetime.date.today, verbose_name='Дата последнего получения бонусов'),
+        ),
+    ]
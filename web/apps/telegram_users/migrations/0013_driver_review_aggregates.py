@@ -0,0 +1,97 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def migrate_reviews_to_aggregates(apps, schema_editor):
+    """Переносит оценки из JSON списка в агрегаты и таблицу оценок"""
+    TaxiDriver = apps.get_model('telegram_users', 'TaxiDriver')
+    DriverReview = apps.get_model('telegram_users', 'DriverReview')
+
+    drivers = TaxiDriver.objects.exclude(reviews=[]).only('id', 'reviews')
+    for driver in drivers.iterator(chunk_size=500):
+        marks = [int(mark) for mark in driver.reviews if 1 <= int(mark) <= 5]
+        if not marks:
+            continue
+
+        stars_counts = {
+            f'stars_{mark}_count': marks.count(mark)
+            for mark in range(1, 6)
+        }
+        TaxiDriver.objects.filter(id=driver.id).update(
+            reviews_count=len(marks),
+            reviews_sum=sum(marks),
+            rating=round(sum(marks) / len(marks), 1),
+            **stars_counts,
+        )
+        DriverReview.objects.bulk_create(
+            [DriverReview(driver_id=driver.id, mark=mark) for mark in marks],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_users', '0012_telegramuser_last_add_points_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taxidriver',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='taxidriver',
+            name='reviews_sum',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.AddField(
+            model_name='taxidriver',
+            name='stars_1_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 1 ⭐'),
+        ),
+        migrations.AddField(
+            model_name='taxidriver',
+            name='stars_2_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 2 ⭐'),
+        ),
+        migrations.AddField(
+            model_name='taxidriver',
+            name='stars_3_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 3 ⭐'),
+        ),
+        migrations.AddField(
+            model_name='taxidriver',
+            name='stars_4_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 4 ⭐'),
+        ),
+        migrations.AddField(
+            model_name='taxidriver',
+            name='stars_5_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Оценок 5 ⭐'),
+        ),
+        migrations.CreateModel(
+            name='DriverReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('mark', models.PositiveSmallIntegerField(choices=[(1, '1 ⭐'), (2, '2 ⭐'), (3, '3 ⭐'), (4, '4 ⭐'), (5, '5 ⭐')], verbose_name='Оценка')),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='driver_reviews', to='telegram_users.taxidriver', verbose_name='Водитель')),
+            ],
+            options={
+                'verbose_name': 'Оценка водителя',
+                'verbose_name_plural': 'Оценки водителей',
+            },
+        ),
+        migrations.RunPython(
+            migrate_reviews_to_aggregates,
+            migrations.RunPython.noop,
+        ),
+        migrations.RemoveField(
+            model_name='taxidriver',
+            name='reviews',
+        ),
+    ]
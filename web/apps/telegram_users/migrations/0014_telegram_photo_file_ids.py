@@ -0,0 +1,43 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_users', '0013_driver_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='front_photo_file_id',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='file_id фото спереди'),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='profile_photo_file_id',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='file_id фото сбоку'),
+        ),
+        migrations.AddField(
+            model_name='taxidriver',
+            name='passport_photo_file_id',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='file_id фото паспорта'),
+        ),
+        migrations.AlterField(
+            model_name='car',
+            name='front_photo',
+            field=models.ImageField(blank=True, upload_to='cars/fronts/', verbose_name='Фото спереди'),
+        ),
+        migrations.AlterField(
+            model_name='car',
+            name='profile_photo',
+            field=models.ImageField(blank=True, upload_to='cars/profiles/', verbose_name='Фото сбоку'),
+        ),
+        migrations.AlterField(
+            model_name='taxidriver',
+            name='passport_photo',
+            field=models.ImageField(blank=True, upload_to='passports/', verbose_name='Фото паспорта'),
+        ),
+    ]
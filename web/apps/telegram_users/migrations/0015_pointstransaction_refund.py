@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_users', '0014_telegram_photo_file_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pointstransaction',
+            name='type',
+            field=models.CharField(choices=[('Initial', 'Начальный баланс'), ('Accrual', 'Начисление'), ('Write-off', 'Списание'), ('Expiration', 'Сгорание'), ('Refund', 'Возврат')], max_length=15, verbose_name='Тип операции'),
+        ),
+    ]
@@ -2,26 +2,111 @@ from datetime import date
 
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Cast, Round
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+
+from web.db.base_manager import AsyncBaseManager
 from web.db.model_mixins import (
     AsyncBaseModel,
     AbstractTelegramUser,
     TariffMixin,
-    RequestStatusMixin
+    RequestStatusMixin,
+    TimestampMixin
 )
 from web.services.telegram import telegram_service
 
 
+class TelegramUserManager(AsyncBaseManager):
+    """
+    Менеджер telegram пользователей.
+
+    Баланс баллов меняется только атомарными UPDATE с F() выражениями,
+    каждое изменение записывается в PointsTransaction.
+    """
+
+    @transaction.atomic
+    def add_points(
+            self,
+            telegram_user_id: int,
+            points: int,
+            type: str | None = None,
+            payment_id: int | None = None,
+    ):
+        self.filter(id=telegram_user_id).update(
+            points=F('points') + points,
+            last_add_points_date=timezone.now().date(),
+        )
+        PointsTransaction.objects.create(
+            telegram_user_id=telegram_user_id,
+            amount=points,
+            type=type or PointsTransaction.ACCRUAL,
+            payment_id=payment_id,
+        )
+
+    @transaction.atomic
+    def write_off_points(self, telegram_user_id: int, points: int) -> bool:
+        """
+        Списывает баллы, если их достаточно.
+        Возвращает False, если баланс ушел бы в минус.
+        """
+        is_written_off = self.filter(
+            id=telegram_user_id,
+            points__gte=points,
+        ).update(points=F('points') - points)
+
+        if is_written_off:
+            PointsTransaction.objects.create(
+                telegram_user_id=telegram_user_id,
+                amount=-points,
+                type=PointsTransaction.WRITE_OFF,
+            )
+
+        return bool(is_written_off)
+
+    @transaction.atomic
+    def refund_points(
+            self,
+            telegram_user_id: int,
+            points: int,
+            payment_id: int | None = None,
+    ):
+        """
+        Возвращает списанные баллы, если оплата не состоялась.
+        Не считается начислением и не продлевает срок жизни баллов.
+        """
+        self.filter(id=telegram_user_id).update(points=F('points') + points)
+        PointsTransaction.objects.create(
+            telegram_user_id=telegram_user_id,
+            amount=points,
+            type=PointsTransaction.REFUND,
+            payment_id=payment_id,
+        )
+
+    async def aadd_points(self, *args, **kwargs):
+        return await sync_to_async(self.add_points)(*args, **kwargs)
+
+    async def awrite_off_points(self, *args, **kwargs) -> bool:
+        return await sync_to_async(self.write_off_points)(*args, **kwargs)
+
+    async def arefund_points(self, *args, **kwargs):
+        return await sync_to_async(self.refund_points)(*args, **kwargs)
+
+
 class TelegramUser(AbstractTelegramUser, TariffMixin):
     """Модель telegram пользователя(заказчика)"""
     points = models.PositiveBigIntegerField(_('Баллы'), default=200)
     last_add_points_date = models.DateField(
         _('Дата последнего получения бонусов'),
-        default=date.today
+        default=date.today,
+        db_index=True,
     )
 
+    objects = TelegramUserManager()
+
     class Meta:
         verbose_name = _('пользователь')
         verbose_name_plural = _('Telegram пользователи')
@@ -46,6 +131,53 @@ class TelegramUser(AbstractTelegramUser, TariffMixin):
             self.last_add_points_date = timezone.now().date()
 
 
+class PointsTransaction(AsyncBaseModel, TimestampMixin):
+    """Модель операции с баллами пользователя"""
+    INITIAL = 'Initial'
+    ACCRUAL = 'Accrual'
+    WRITE_OFF = 'Write-off'
+    EXPIRATION = 'Expiration'
+    REFUND = 'Refund'
+
+    TYPE_CHOICES = [
+        (INITIAL, _('Начальный баланс')),
+        (ACCRUAL, _('Начисление')),
+        (WRITE_OFF, _('Списание')),
+        (EXPIRATION, _('Сгорание')),
+        (REFUND, _('Возврат')),
+    ]
+
+    telegram_user = models.ForeignKey(
+        'telegram_users.TelegramUser',
+        related_name='points_transactions',
+        on_delete=models.CASCADE,
+        verbose_name=_('Пользователь'),
+    )
+    amount = models.BigIntegerField(_('Количество баллов'))
+    type = models.CharField(
+        _('Тип операции'),
+        choices=TYPE_CHOICES,
+        max_length=15,
+    )
+    payment = models.ForeignKey(
+        'orders.Payment',
+        related_name='points_transactions',
+        on_delete=models.SET_NULL,
+        verbose_name=_('Оплата'),
+        null=True,
+        blank=True,
+    )
+
+    updated_at = None # Операции не изменяются
+
+    class Meta:
+        verbose_name = _('Операция с баллами')
+        verbose_name_plural = _('Операции с баллами')
+
+    def __str__(self):
+        return f'{self.get_type_display()} {self.amount}'
+
+
 class Car(AsyncBaseModel, RequestStatusMixin):
     """Модель авто"""
 
@@ -53,8 +185,29 @@ class Car(AsyncBaseModel, RequestStatusMixin):
     gos_number = models.CharField(_('Государственный номер'), max_length=20)
     vin = models.CharField(_('ВИН'), max_length=20)
 
-    front_photo = models.ImageField(_('Фото спереди'), upload_to='cars/fronts/')
-    profile_photo = models.ImageField(_('Фото сбоку'), upload_to='cars/profiles/')
+    front_photo = models.ImageField(
+        _('Фото спереди'),
+        upload_to='cars/fronts/',
+        blank=True,
+    )
+    profile_photo = models.ImageField(
+        _('Фото сбоку'),
+        upload_to='cars/profiles/',
+        blank=True,
+    )
+    # В режиме TELEGRAM_MEDIA_MODE=lazy вместо файлов хранятся file_id Telegram
+    front_photo_file_id = models.CharField(
+        _('file_id фото спереди'),
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
+    profile_photo_file_id = models.CharField(
+        _('file_id фото сбоку'),
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
 
     driver = models.ForeignKey(
         'telegram_users.TaxiDriver',
@@ -81,7 +234,7 @@ class Car(AsyncBaseModel, RequestStatusMixin):
 
         if self.status == self.APPROVED:
             self.driver.car_id = self.id
-            self.driver.save()
+            self.driver.save(update_fields=['car'])
             text = (
                 'Ваше авто одобрено администрацией!\n\n'
                 f'<a href="{settings.PRIVATE_TAXI_ORDERS_CHANNEL_LINK}">Канал с заказами</a>'
@@ -97,12 +250,48 @@ class Car(AsyncBaseModel, RequestStatusMixin):
         super().save(*args, **kwargs)
 
 
+class TaxiDriverManager(AsyncBaseManager):
+    """Менеджер водителей"""
+
+    @transaction.atomic
+    def add_review(self, driver_id: int, mark: int):
+        """
+        Учитывает оценку водителя одним UPDATE агрегатов
+        без чтения истории отзывов.
+        """
+        stars_field = f'stars_{mark}_count'
+        self.filter(id=driver_id).update(
+            reviews_count=F('reviews_count') + 1,
+            reviews_sum=F('reviews_sum') + mark,
+            rating=Round(
+                Cast(F('reviews_sum') + mark, models.FloatField())
+                / (F('reviews_count') + 1),
+                1,
+            ),
+            **{stars_field: F(stars_field) + 1},
+        )
+        DriverReview.objects.create(driver_id=driver_id, mark=mark)
+
+    async def aadd_review(self, *args, **kwargs):
+        return await sync_to_async(self.add_review)(*args, **kwargs)
+
+
 class TaxiDriver(AbstractTelegramUser, TariffMixin):
     """Модель водителя"""
     full_name = models.CharField(_('ФИО'), max_length=150)
     phone_number = models.CharField(_('Номер телефона'), max_length=50, unique=True)
     passport_data = models.CharField(_('Паспортные данные'), max_length=30)
-    passport_photo = models.ImageField(_('Фото паспорта'), upload_to='passports/')
+    passport_photo = models.ImageField(
+        _('Фото паспорта'),
+        upload_to='passports/',
+        blank=True,
+    )
+    passport_photo_file_id = models.CharField(
+        _('file_id фото паспорта'),
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
     is_active = models.BooleanField(_('Работает'), default=False)
     rating = models.FloatField(
         _('Рейтинг'),
@@ -112,7 +301,13 @@ class TaxiDriver(AbstractTelegramUser, TariffMixin):
         db_index=True,
         default=None
     )
-    reviews: list = models.JSONField(default=list)
+    reviews_count = models.PositiveIntegerField(_('Количество оценок'), default=0)
+    reviews_sum = models.PositiveBigIntegerField(_('Сумма оценок'), default=0)
+    stars_1_count = models.PositiveIntegerField(_('Оценок 1 ⭐'), default=0)
+    stars_2_count = models.PositiveIntegerField(_('Оценок 2 ⭐'), default=0)
+    stars_3_count = models.PositiveIntegerField(_('Оценок 3 ⭐'), default=0)
+    stars_4_count = models.PositiveIntegerField(_('Оценок 4 ⭐'), default=0)
+    stars_5_count = models.PositiveIntegerField(_('Оценок 5 ⭐'), default=0)
 
     car = models.OneToOneField(
         'telegram_users.Car',
@@ -121,6 +316,8 @@ class TaxiDriver(AbstractTelegramUser, TariffMixin):
         null=True,
     )
 
+    objects = TaxiDriverManager()
+
     class Meta:
         verbose_name = _('Таксист')
         verbose_name_plural = _('Таксисты')
@@ -128,19 +325,27 @@ class TaxiDriver(AbstractTelegramUser, TariffMixin):
     def __str__(self):
         return f'Таксист {self.full_name}'
 
-    def save(self, *args, **kwargs):
-        self._update_rating()
-        super().save(*args, **kwargs)
 
-    async def asave(self, *args, **kwargs):
-        self._update_rating()
-        await super().asave(*args, **kwargs)
+class DriverReview(AsyncBaseModel, TimestampMixin):
+    """Модель оценки водителя"""
+    MARK_CHOICES = [(mark, f'{mark} ⭐') for mark in range(1, 6)]
 
-    def _update_rating(self):
-        if not self.reviews:
-            return
+    driver = models.ForeignKey(
+        'telegram_users.TaxiDriver',
+        related_name='driver_reviews',
+        on_delete=models.CASCADE,
+        verbose_name=_('Водитель'),
+    )
+    mark = models.PositiveSmallIntegerField(_('Оценка'), choices=MARK_CHOICES)
+
+    updated_at = None # Оценки не изменяются
 
-        self.rating = round(sum(self.reviews) / len(self.reviews), 1)
+    class Meta:
+        verbose_name = _('Оценка водителя')
+        verbose_name_plural = _('Оценки водителей')
+
+    def __str__(self):
+        return f'{self.mark} ⭐'
 
 
 class TariffDriverRequest(AsyncBaseModel, TariffMixin, RequestStatusMixin):
@@ -170,7 +375,7 @@ class TariffDriverRequest(AsyncBaseModel, TariffMixin, RequestStatusMixin):
         if self.status == self.APPROVED:
             text = 'Ваша заявка одобренна администрацией!'
             self.driver.tariff = self.tariff
-            self.driver.save()
+            self.driver.save(update_fields=['tariff'])
         else:
             text = 'Ваша заявка не была одобрена администрацией.'
 
@@ -1,27 +1,71 @@
 from datetime import timedelta
-from typing import Sequence
 
 from celery import shared_task
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
 from django.utils import timezone
+from loguru import logger
 
-from web.apps.telegram_users.models import TaxiDriver, TelegramUser
+from web.apps.telegram_users.models import TelegramUser, PointsTransaction
 
 
 @shared_task(ignore_result=True)
-def reset_to_zero_points_task():
-    now = timezone.now()
-    reset_to_zero_date = (
-            now + timedelta(minutes=5)
-    ).date()
-    telegram_users = TelegramUser.objects.all()
-    updated_users = []
-
-    for user in telegram_users:
-        if user.last_add_points_date < reset_to_zero_date:
-            continue
-
-        user.points = 0
-        updated_users.append(user)
-
-    TelegramUser.objects.bulk_update(updated_users, ['points'])
+def reset_to_zero_points_task(
+        dry_run: bool = False,
+        chunk_size: int = settings.RESET_TO_ZERO_POINTS_CHUNK_SIZE,
+):
+    """
+    Задача для сгорания баллов пользователей, которые не получали баллы
+    RESET_TO_ZERO_POINTS_DAYS_INTERVAL дней.
+
+    Обнуляет баланс пачками по chunk_size пользователей, каждая пачка
+    в отдельной короткой транзакции. В режиме dry_run только считает
+    затронутых пользователей и баллы.
+    """
+    reset_to_zero_date = timezone.now().date() - timedelta(
+        days=settings.RESET_TO_ZERO_POINTS_DAYS_INTERVAL
+    )
+    expired_users = TelegramUser.objects.filter(
+        last_add_points_date__lte=reset_to_zero_date,
+        points__gt=0,
+    )
+
+    if dry_run:
+        stats = expired_users.aggregate(points=Sum('points'))
+        logger.info(
+            f'Points expiry dry run: {expired_users.count()} users, '
+            f'{stats["points"] or 0} points would be reset'
+        )
+        return
+
+    last_id = 0
+    users_count = 0
+    while True:
+        with transaction.atomic():
+            users_points = list(
+                expired_users
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .select_for_update()
+                .values_list('id', 'points')[:chunk_size]
+            )
+            if not users_points:
+                break
+
+            user_ids = [user_id for user_id, _ in users_points]
+            PointsTransaction.objects.bulk_create([
+                PointsTransaction(
+                    telegram_user_id=user_id,
+                    amount=-points,
+                    type=PointsTransaction.EXPIRATION,
+                )
+                for user_id, points in users_points
+            ])
+            TelegramUser.objects.filter(id__in=user_ids).update(points=0)
+
+        last_id = user_ids[-1]
+        users_count += len(user_ids)
+        logger.info(f'Points expiry: reset {users_count} users')
+
+    logger.info(f'Points expiry finished: reset {users_count} users')
@@ -2,6 +2,12 @@ import os
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import (
+    worker_init,
+    worker_process_init,
+    worker_shutdown,
+    worker_process_shutdown,
+)
 
 from . import settings
 
@@ -14,7 +20,34 @@ app.autodiscover_tasks()
 app.conf.beat_schedule = {
     'reset_to_zero_points_task':{
         'task': 'web.apps.telegram_users.tasks.reset_to_zero_points_task',
-        'schedule': crontab(hour='0'),
+        'schedule': crontab(hour='0', minute='0'),
+    },
+    'release_expired_product_reservations_task': {
+        'task': 'web.apps.products.tasks.release_expired_product_reservations_task',
+        'schedule': crontab(minute='*'),
     },
 }
 app.conf.timezone = 'Europe/Moscow'
+
+
+@worker_init.connect
+@worker_process_init.connect
+def start_async_services(**kwargs):
+    """Поднимает фоновый event loop и пул соединений Telegram в воркере."""
+    from web.services.telegram import async_telegram_service
+    from web.utils.event_loop import run_async
+
+    run_async(async_telegram_service.startup())
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def stop_async_services(**kwargs):
+    from web.services.telegram import async_telegram_service
+    from web.utils.event_loop import background_loop
+
+    if not background_loop.is_running:
+        return
+
+    background_loop.run(async_telegram_service.shutdown())
+    background_loop.stop()
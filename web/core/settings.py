@@ -111,6 +111,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
 REDIS_PORT = os.getenv('REDIS_PORT', 6379)
 REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}'
+REDIS_CACHE_URL = f'{REDIS_URL}/2'
+
+# Хранилище FSM бота: redis или memory
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'redis')
+FSM_REDIS_URL = f'{REDIS_URL}/3'
+FSM_STATE_TTL = int(os.getenv('FSM_STATE_TTL', 60 * 60 * 24))
+FSM_DATA_TTL = int(os.getenv('FSM_DATA_TTL', 60 * 60 * 24))
+
+# Как часто процесс сверяет кэш singleton настроек с версией в Redis
+SINGLETON_CACHE_CHECK_INTERVAL = int(os.getenv('SINGLETON_CACHE_CHECK_INTERVAL', 5))
 
 CELERY_BROKER_URL = f'{REDIS_URL}/0'
 CELERY_RESULT_BACKEND = f'{REDIS_URL}/1'
@@ -124,7 +134,32 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 YOOKASSA_PAYMENT_TOKEN = os.getenv('YOOKASSA_PAYMENT_TOKEN')
 BOT_USERNAME = os.getenv('BOT_USERNAME')
 BOT_LINK = f'https://t.me/{BOT_USERNAME}'
-MAX_MESSAGE_PER_SECOND = int(os.getenv('MAX_MESSAGE_PER_SECOND', 1))
+
+# Режим получения апдейтов: polling или webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+# Публичный https адрес nginx, на который Telegram отправляет апдейты
+BOT_WEBHOOK_BASE_URL = os.getenv('BOT_WEBHOOK_BASE_URL', '')
+BOT_WEBHOOK_PATH = '/bot/webhook'
+BOT_WEBHOOK_SECRET = os.getenv('BOT_WEBHOOK_SECRET', '')
+BOT_WEBHOOK_HOST = os.getenv('BOT_WEBHOOK_HOST', '0.0.0.0')
+BOT_WEBHOOK_PORT = int(os.getenv('BOT_WEBHOOK_PORT', 8080))
+BOT_WEBHOOK_MAX_CONNECTIONS = int(os.getenv('BOT_WEBHOOK_MAX_CONNECTIONS', 40))
+# Очередь апдейтов webhook и число одновременно обрабатываемых апдейтов
+BOT_UPDATE_QUEUE_SIZE = int(os.getenv('BOT_UPDATE_QUEUE_SIZE', 1000))
+BOT_UPDATE_WORKERS = int(os.getenv('BOT_UPDATE_WORKERS', 50))
+
+# Лимиты запросов пользователя к боту в формате "группа:запросов/секунд".
+# Группа - тип апдейта или значение флага throttling у хэндлера.
+THROTTLING_RATES = {
+    group: tuple(int(value) for value in rate.split('/'))
+    for group, rate in (
+        item.split(':') for item in os.getenv(
+            'THROTTLING_RATES',
+            'message:3/1,callback_query:5/1,address:10/60,order:3/60'
+        ).split(',')
+    )
+}
+THROTTLING_LOCAL_CACHE_SIZE = int(os.getenv('THROTTLING_LOCAL_CACHE_SIZE', 10000))
 
 PRIVATE_TAXI_ORDERS_CHANNEL_LINK = os.getenv('PRIVATE_TAXI_ORDERS_CHANNEL_LINK')
 PRIVATE_TAXI_ORDERS_CHANNEL_ID = os.getenv('PRIVATE_TAXI_ORDERS_CHANNEL_ID')
@@ -139,14 +174,81 @@ ORDER_CITIES = [
     'Санкт-Петербург',
 ]
 
-SEND_ORDER_TO_CHANNEL_MINUTES_INTERVAL = int(os.getenv('SEND_ORDER_TO_CHANNEL_MINUTES_INTERVAL', 1))
+# Волны рассылки заказа водителям в формате "радиус_км:водителей:таймаут_сек".
+# После последней волны заказ отправляется в закрытый канал.
+ORDER_DISPATCH_WAVES = [
+    (float(radius_km), int(drivers_count), int(timeout_seconds))
+    for radius_km, drivers_count, timeout_seconds in (
+        wave.split(':') for wave in os.getenv(
+            'ORDER_DISPATCH_WAVES',
+            '2:5:30,5:10:45,10:20:60'
+        ).split(',')
+    )
+]
 
 # Yookassa SDK
 Configuration.account_id = os.getenv('YOOKASSA_SECRET_ACCOUNT_ID')
 Configuration.secret_key = os.getenv('YOOKASSA_SECRET_KEY')
+# Повторы создания платежа при сетевых ошибках и 5xx/429 от YooKassa
+YOOKASSA_MAX_RETRIES = int(os.getenv('YOOKASSA_MAX_RETRIES', 3))
 
 API_2GIS_KEY = os.getenv('API_2GIS_KEY')
+API_2GIS_TIMEOUT = float(os.getenv('API_2GIS_TIMEOUT', 5))
+API_2GIS_MAX_CONNECTIONS = int(os.getenv('API_2GIS_MAX_CONNECTIONS', 20))
+API_2GIS_MAX_CONCURRENCY = int(os.getenv('API_2GIS_MAX_CONCURRENCY', 10))
+
+# Кэш геокодирования 2GIS
+GEOCODE_CACHE_TTL = int(os.getenv('GEOCODE_CACHE_TTL', 60 * 60 * 24 * 7))
+GEOCODE_CACHE_LOCAL_TTL = int(os.getenv('GEOCODE_CACHE_LOCAL_TTL', 60 * 60))
+GEOCODE_CACHE_LOCAL_SIZE = int(os.getenv('GEOCODE_CACHE_LOCAL_SIZE', 2048))
+# Количество знаков после запятой при округлении координат (4 ≈ 11 метров)
+GEOCODE_CACHE_PRECISION = int(os.getenv('GEOCODE_CACHE_PRECISION', 4))
+
+# Кэш маршрутов 2GIS
+ROUTE_CACHE_TTL = int(os.getenv('ROUTE_CACHE_TTL', 60 * 60 * 24))
+ROUTE_CACHE_LOCAL_SIZE = int(os.getenv('ROUTE_CACHE_LOCAL_SIZE', 2048))
+# Длина geohash точек маршрута (7 ≈ 150 метров)
+ROUTE_CACHE_GEOHASH_PRECISION = int(os.getenv('ROUTE_CACHE_GEOHASH_PRECISION', 7))
+# Размер интервала времени суток, в пределах которого маршрут с пробками актуален
+ROUTE_CACHE_BUCKET_MINUTES = int(os.getenv('ROUTE_CACHE_BUCKET_MINUTES', 30))
+
+# Кэш страниц каталога товаров
+PRODUCT_CATALOG_CACHE_TTL = int(os.getenv('PRODUCT_CATALOG_CACHE_TTL', 60 * 60))
+
+# Резерв товара до подтверждения оплаты
+PRODUCT_RESERVATION_TTL_MINUTES = int(os.getenv('PRODUCT_RESERVATION_TTL_MINUTES', 30))
+PRODUCT_RESERVATION_RELEASE_CHUNK_SIZE = int(os.getenv('PRODUCT_RESERVATION_RELEASE_CHUNK_SIZE', 500))
 
 TELEGRAM_API_URL = 'https://api.telegram.org'
-
-RESET_TO_ZERO_POINTS_DAYS_INTERVAL = os.getenv('RESET_TO_ZERO_POINTS_DAYS_INTERVAL', 35)
+# Лимиты Telegram Bot API: сообщений в секунду всего и в один чат
+TELEGRAM_GLOBAL_RATE_LIMIT = int(os.getenv('TELEGRAM_GLOBAL_RATE_LIMIT', 30))
+TELEGRAM_CHAT_RATE_LIMIT = int(os.getenv('TELEGRAM_CHAT_RATE_LIMIT', 1))
+# Сколько сообщений подряд можно отправить в личный чат без ожидания
+TELEGRAM_CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', 5))
+TELEGRAM_GROUP_RATE_PER_MINUTE = int(os.getenv('TELEGRAM_GROUP_RATE_PER_MINUTE', 20))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', 3))
+# Пул соединений AsyncTelegramService
+TELEGRAM_MAX_CONNECTIONS = int(os.getenv('TELEGRAM_MAX_CONNECTIONS', 100))
+TELEGRAM_KEEPALIVE_TIMEOUT = int(os.getenv('TELEGRAM_KEEPALIVE_TIMEOUT', 60))
+TELEGRAM_TIMEOUT = int(os.getenv('TELEGRAM_TIMEOUT', 30))
+# Размер части при потоковом скачивании файлов Telegram
+TELEGRAM_DOWNLOAD_CHUNK_SIZE = int(os.getenv('TELEGRAM_DOWNLOAD_CHUNK_SIZE', 64 * 1024))
+# Фото водителей: eager - скачиваются при регистрации в MEDIA_ROOT,
+# lazy - хранится только file_id, файл скачивается при просмотре в админке
+TELEGRAM_MEDIA_MODE = os.getenv('TELEGRAM_MEDIA_MODE', 'lazy')
+# Дисковый кэш фото в режиме lazy, вне MEDIA_ROOT, чтобы nginx не раздавал паспорта
+TELEGRAM_MEDIA_CACHE_DIR = os.getenv(
+    'TELEGRAM_MEDIA_CACHE_DIR',
+    os.path.join(BASE_DIR, 'media_cache/'),
+)
+TELEGRAM_MEDIA_CACHE_MAX_SIZE = int(os.getenv('TELEGRAM_MEDIA_CACHE_MAX_SIZE', 500 * 1024 * 1024))
+TELEGRAM_MEDIA_THUMBNAIL_SIZE = int(os.getenv('TELEGRAM_MEDIA_THUMBNAIL_SIZE', 200))
+TELEGRAM_BROADCAST_CONCURRENCY = int(os.getenv('TELEGRAM_BROADCAST_CONCURRENCY', 20))
+
+# Поиск ближайших водителей по трансляции геопозиции
+DRIVER_LOCATION_TTL = int(os.getenv('DRIVER_LOCATION_TTL', 60 * 15))
+DRIVER_SEARCH_RADIUS_KM = float(os.getenv('DRIVER_SEARCH_RADIUS_KM', 5))
+DRIVER_SEARCH_LIMIT = int(os.getenv('DRIVER_SEARCH_LIMIT', 10))
+
+RESET_TO_ZERO_POINTS_DAYS_INTERVAL = int(os.getenv('RESET_TO_ZERO_POINTS_DAYS_INTERVAL', 35))
+RESET_TO_ZERO_POINTS_CHUNK_SIZE = int(os.getenv('RESET_TO_ZERO_POINTS_CHUNK_SIZE', 5000))
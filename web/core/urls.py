@@ -3,8 +3,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path
 
+from web.apps.orders.views import yookassa_webhook_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path(
+        'payments/yookassa/webhook/',
+        yookassa_webhook_view,
+        name='yookassa_webhook',
+    ),
 ]
 
 if settings.DEBUG:
@@ -2,51 +2,47 @@
 
 from django.db import models
 from django.core.exceptions import ObjectDoesNotExist
-from asgiref.sync import sync_to_async
 
 
 class AsyncBaseManager(models.Manager):
     """Базовый асинхронный менеджер модели"""
-    @sync_to_async
-    def aget(self, *args, **kwargs):
+    async def aget(self, *args, **kwargs):
         try:
-            obj = super().get(*args, **kwargs)
+            obj = await super().aget(*args, **kwargs)
         except ObjectDoesNotExist:
             obj = None
             
         return obj
     
-    @sync_to_async
-    def acreate(self, **kwargs):
-        return super().create(**kwargs)
+    async def acreate(self, **kwargs):
+        return await super().acreate(**kwargs)
     
-    @sync_to_async
-    def a_all(
+    async def a_all(
         self,
         select_relations: Sequence[str] = [],
         prefetch_relations: Sequence[str] = [],
     ) -> List:
-        return list(
+        queryset = (
             super()
             .select_related(*select_relations)
             .prefetch_related(*prefetch_relations)
         )
+        return [obj async for obj in queryset]
     
-    @sync_to_async
-    def afilter(
+    async def afilter(
         self,
         select_relations: Sequence[str] = [],
         prefetch_relations: Sequence[str] = [],
         *args,
         **kwargs
     ) -> List:
-        return list(
+        queryset = (
             super()
             .filter(*args, **kwargs)
             .select_related(*select_relations)
             .prefetch_related(*prefetch_relations)
         )
+        return [obj async for obj in queryset]
     
-    @sync_to_async
-    def aget_or_create(self, defaults: Dict = {}, **kwargs):
-        return super().get_or_create(defaults, **kwargs)
\ No newline at end of file
+    async def aget_or_create(self, defaults: Dict = {}, **kwargs):
+        return await super().aget_or_create(defaults, **kwargs)
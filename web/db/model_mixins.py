@@ -1,5 +1,14 @@
-from django.db import models
+import time
+from copy import copy
+from typing import Dict, List, Optional
+
+import redis
+from django.conf import settings
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
+from loguru import logger
+
+from web.services.redis import redis_client, get_async_redis_client
 
 from .base_manager import AsyncBaseManager
 from .models import PriceField
@@ -45,19 +54,89 @@ class TimestampMixin(models.Model):
 
 
 class SingletonModel(models.Model):
-    """Singelton модель"""
+    """
+    Singelton модель
+
+    Объект кэшируется в памяти процесса. Актуальность кэша проверяется
+    не чаще раза в SINGLETON_CACHE_CHECK_INTERVAL секунд по счетчику версии
+    в Redis, который увеличивается при каждом сохранении.
+    """
+    _cache: Dict[type, List] = {} # {модель: [объект, версия, время проверки]}
 
     def save(self, *args, **kwargs):
-        if self.__class__.objects.count() == 0:
-            super().save(*args, **kwargs)
-        else:
-            existing = self.__class__.objects.get()
-            self.id = existing.id
-            super().save(*args, **kwargs)
+        # UPDATE ... WHERE id = 1, INSERT только если строки еще нет
+        self.pk = 1
+        super().save(*args, **kwargs)
+        transaction.on_commit(self.__class__.invalidate_cache)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(self.__class__.invalidate_cache)
+        return result
+
+    @classmethod
+    def _version_key(cls) -> str:
+        return f'singleton:version:{cls._meta.label_lower}'
+
+    @classmethod
+    def invalidate_cache(cls):
+        SingletonModel._cache.pop(cls, None)
+        try:
+            redis_client.incr(cls._version_key())
+        except redis.RedisError as e:
+            logger.warning(f'Failed to invalidate {cls.__name__} cache: {e}')
+
+    @classmethod
+    def _get_fresh_cached(cls) -> Optional['SingletonModel']:
+        entry = SingletonModel._cache.get(cls)
+        if entry and time.monotonic() - entry[2] < settings.SINGLETON_CACHE_CHECK_INTERVAL:
+            return copy(entry[0])
+
+    @classmethod
+    def _get_cached(cls, version: Optional[str]) -> Optional['SingletonModel']:
+        entry = SingletonModel._cache.get(cls)
+        if entry and version is not None and entry[1] == version:
+            entry[2] = time.monotonic()
+            return copy(entry[0])
+
+    @classmethod
+    def _set_cached(cls, obj: 'SingletonModel', version: Optional[str]):
+        # Без версии (Redis недоступен) не кэшируем, иначе не узнаем об изменениях
+        if version is not None:
+            SingletonModel._cache[cls] = [copy(obj), version, time.monotonic()]
 
     @classmethod
     def load(cls):
+        if (obj := cls._get_fresh_cached()) is not None:
+            return obj
+
+        try:
+            version = redis_client.get(cls._version_key()) or '0'
+        except redis.RedisError:
+            version = None
+
+        if (obj := cls._get_cached(version)) is not None:
+            return obj
+
         obj, created = cls.objects.get_or_create(pk=1)
+        cls._set_cached(obj, version)
+        return obj
+
+    @classmethod
+    async def aload(cls):
+        if (obj := cls._get_fresh_cached()) is not None:
+            return obj
+
+        try:
+            version = await get_async_redis_client().get(cls._version_key()) or '0'
+        except redis.RedisError:
+            version = None
+
+        if (obj := cls._get_cached(version)) is not None:
+            return obj
+
+        obj, created = await cls.objects.aget_or_create(pk=1)
+        cls._set_cached(obj, version)
         return obj
 
     class Meta:
@@ -1,9 +1,15 @@
+import asyncio
 from enum import Enum
-from typing import Tuple, Union, Dict
+from typing import Tuple, Union, Dict, Optional
 
+import aiohttp
 import requests
 
 from django.conf import settings
+from django.utils import timezone
+
+from web.services.cache import TwoTierCache, MISSING
+from web.utils.geo import encode_geohash
 
 
 class TransportEnum(Enum):
@@ -30,27 +36,89 @@ class API2GisError(ValueError):
     pass
 
 
-class API2GisService:
-    """2GIS API Servie"""
-    def __init__(self, api_key: str = settings.API_2GIS_KEY):
-        self.__api_key = api_key
+class BaseAPI2GisService:
+    """Общая логика построения запросов и разбора ответов 2GIS API"""
+    geocode_url = 'https://catalog.api.2gis.com/3.0/items/geocode'
+    routing_url = 'http://routing.api.2gis.com/routing/7.0.0/global'
 
-    def get_cords(
+    def __init__(
             self,
-            address: str,
-        return_data: bool = False,
-    ) -> Tuple[float, float]:
-        """Преобразует адрес в координаты (широта, долгота)."""
+            api_key: str = settings.API_2GIS_KEY,
+            cache: Optional[TwoTierCache] = None,
+            route_cache: Optional[TwoTierCache] = None,
+    ):
+        self._api_key = api_key
+        self.cache = cache
+        self.route_cache = route_cache
+
+    @staticmethod
+    def _normalize_address(address: str) -> str:
+        return ' '.join(address.lower().replace(',', ' ').split())
+
+    def _cords_cache_key(self, address: str) -> str:
+        return f'cords:{self._normalize_address(address)}'
+
+    def _match_cache_key(self, address: str) -> str:
+        return f'match:{self._normalize_address(address)}'
+
+    @staticmethod
+    def _address_cache_key(lat: float, lon: float) -> str:
+        precision = settings.GEOCODE_CACHE_PRECISION
+        return f'address:{lat:.{precision}f}:{lon:.{precision}f}'
+
+    @staticmethod
+    def _route_cache_key_and_ttl(
+            from_lat: float,
+            from_lon: float,
+            to_lat: float,
+            to_lon: float,
+            route_mode: RouteModeEnum,
+            traffic_mode: TrafficModeEnum,
+            transport: TransportEnum,
+    ) -> Tuple[str, int]:
+        """
+        Ключ маршрута по geohash ячейкам точек и режимам построения.
+
+        Для режима пробок ключ привязан к интервалу времени суток
+        и живет до его окончания, так как загруженность дорог меняется.
+        """
+        precision = settings.ROUTE_CACHE_GEOHASH_PRECISION
+        key = (
+            f'{encode_geohash(from_lat, from_lon, precision)}'
+            f':{encode_geohash(to_lat, to_lon, precision)}'
+            f':{transport.value}:{traffic_mode.value}:{route_mode.value}'
+        )
+
+        if traffic_mode != TrafficModeEnum.JAM:
+            return key, settings.ROUTE_CACHE_TTL
+
+        bucket_seconds = settings.ROUTE_CACHE_BUCKET_MINUTES * 60
+        now = timezone.localtime()
+        seconds_of_day = now.hour * 3600 + now.minute * 60 + now.second
+        bucket = seconds_of_day // bucket_seconds
+        ttl = max(bucket_seconds - seconds_of_day % bucket_seconds, 60)
+
+        return f'{key}:{bucket}', ttl
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            'geocode': self.cache.get_stats() if self.cache else {},
+            'route': self.route_cache.get_stats() if self.route_cache else {},
+        }
 
-        url = 'https://catalog.api.2gis.com/3.0/items/geocode'
-        params = {
+    def _get_cords_params(self, address: str) -> Dict:
+        return {
             'q': address,
             'fields': 'items.point',
-            'key': self.__api_key
+            'key': self._api_key
         }
-        response = requests.get(url, params=params)
-        response_data = response.json()
 
+    @staticmethod
+    def _parse_cords(
+            response_data: Dict,
+            address: str,
+            return_data: bool = False,
+    ) -> Union[Tuple[float, float], Dict]:
         if 'result' not in response_data or not response_data['result']['items']:
             raise API2GisError(f'Адрес не найден: {address}')
 
@@ -62,22 +130,18 @@ class API2GisService:
 
         return lat, lon
 
-    def get_route_distance_and_duration(
+    def _get_route_request_data(
             self,
             from_lat: float,
             from_lon: float,
             to_lat: float,
             to_lon: float,
-            route_mode: RouteModeEnum = RouteModeEnum.FASTEST,
-            traffic_mode: TrafficModeEnum = TrafficModeEnum.JAM,
-            transport: TransportEnum = TransportEnum.TAXI,
-            return_data: bool = False,
-    ) -> Union[Tuple[float, float], Dict]:
-        """Рассчитывает расстояние и продолжительность пути по дорогам между двумя точками."""
-
-        url = 'http://routing.api.2gis.com/routing/7.0.0/global'
+            route_mode: RouteModeEnum,
+            traffic_mode: TrafficModeEnum,
+            transport: TransportEnum,
+    ) -> Tuple[Dict, Dict]:
         params = {
-            'key': self.__api_key
+            'key': self._api_key
         }
         payload = {
             'points': [
@@ -98,13 +162,13 @@ class API2GisService:
             'output': 'summary'
         }
 
-        headers = {
-            'Content-Type': 'application/json'
-        }
-
-        response = requests.post(url, params=params, json=payload, headers=headers)
-        response_data = response.json()
+        return params, payload
 
+    @staticmethod
+    def _parse_route(
+            response_data: Dict,
+            return_data: bool = False,
+    ) -> Union[Tuple[float, float], Dict]:
         if 'result' not in response_data:
             raise API2GisError('Не удалось рассчитать маршрут.')
 
@@ -116,25 +180,19 @@ class API2GisService:
 
         return length, duration
 
-    def get_address_by_cords(
-            self,
-            lat: float,
-            lon: float,
-            return_data: bool = False
-    ) -> Union[str, Dict]:
-        """Получает адрес по координатам через 2GIS API."""
-
-        url = 'https://catalog.api.2gis.com/3.0/items/geocode'
-        params = {
+    def _get_address_params(self, lat: float, lon: float) -> Dict:
+        return {
             'lat': lat,  # Широта
             'lon': lon,  # Долгота
             'fields': 'items.address',
-            'key': self.__api_key
+            'key': self._api_key
         }
 
-        response = requests.get(url, params=params)
-        response_data = response.json()
-
+    @staticmethod
+    def _parse_address(
+            response_data: Dict,
+            return_data: bool = False,
+    ) -> Union[str, Dict]:
         not_found_exc = API2GisError('Адрес не найден')
 
         if 'result' not in response_data or not response_data['result']['items']:
@@ -154,12 +212,324 @@ class API2GisService:
         return address_string
 
 
+class API2GisService(BaseAPI2GisService):
+    """2GIS API Servie"""
+
+    def get_cords(
+            self,
+            address: str,
+        return_data: bool = False,
+    ) -> Tuple[float, float]:
+        """Преобразует адрес в координаты (широта, долгота)."""
+        use_cache = self.cache and not return_data
+
+        if use_cache:
+            cached_cords = self.cache.get(self._cords_cache_key(address))
+            if cached_cords is not MISSING:
+                return tuple(cached_cords)
+
+        response = requests.get(
+            self.geocode_url,
+            params=self._get_cords_params(address)
+        )
+        cords = self._parse_cords(response.json(), address, return_data)
+
+        if use_cache:
+            self.cache.set(self._cords_cache_key(address), cords)
+
+        return cords
+
+    def get_route_distance_and_duration(
+            self,
+            from_lat: float,
+            from_lon: float,
+            to_lat: float,
+            to_lon: float,
+            route_mode: RouteModeEnum = RouteModeEnum.FASTEST,
+            traffic_mode: TrafficModeEnum = TrafficModeEnum.JAM,
+            transport: TransportEnum = TransportEnum.TAXI,
+            return_data: bool = False,
+    ) -> Union[Tuple[float, float], Dict]:
+        """Рассчитывает расстояние и продолжительность пути по дорогам между двумя точками."""
+        use_cache = self.route_cache and not return_data
+
+        if use_cache:
+            cache_key, cache_ttl = self._route_cache_key_and_ttl(
+                from_lat, from_lon, to_lat, to_lon,
+                route_mode, traffic_mode, transport,
+            )
+            cached_route = self.route_cache.get(cache_key)
+            if cached_route is not MISSING:
+                return tuple(cached_route)
+
+        params, payload = self._get_route_request_data(
+            from_lat, from_lon, to_lat, to_lon,
+            route_mode, traffic_mode, transport,
+        )
+        headers = {
+            'Content-Type': 'application/json'
+        }
+
+        response = requests.post(
+            self.routing_url,
+            params=params,
+            json=payload,
+            headers=headers
+        )
+        route = self._parse_route(response.json(), return_data)
+
+        if use_cache:
+            self.route_cache.set(cache_key, route, ttl=cache_ttl)
+
+        return route
+
+    def get_address_by_cords(
+            self,
+            lat: float,
+            lon: float,
+            return_data: bool = False
+    ) -> Union[str, Dict]:
+        """Получает адрес по координатам через 2GIS API."""
+        use_cache = self.cache and not return_data
+
+        if use_cache:
+            cached_address = self.cache.get(self._address_cache_key(lat, lon))
+            if cached_address is not MISSING:
+                return cached_address
+
+        response = requests.get(
+            self.geocode_url,
+            params=self._get_address_params(lat, lon)
+        )
+        address = self._parse_address(response.json(), return_data)
+
+        if use_cache:
+            self.cache.set(self._address_cache_key(lat, lon), address)
+
+        return address
+
+
     def find_match_address(
             self,
             address: str
     ) -> Tuple[str, Tuple[int, int]]:
+        if self.cache:
+            cached_match = self.cache.get(self._match_cache_key(address))
+            if cached_match is not MISSING:
+                match_address, cords = cached_match
+                return match_address, tuple(cords)
+
         cords = self.get_cords(address)
-        return self.get_address_by_cords(*cords), cords
+        match_address = self.get_address_by_cords(*cords)
+
+        if self.cache:
+            self.cache.set(self._match_cache_key(address), (match_address, cords))
+
+        return match_address, cords
+
+    def invalidate_address(self, address: str):
+        """Удаляет из кэша результаты геокодирования адреса."""
+        self.cache.delete(self._cords_cache_key(address))
+        self.cache.delete(self._match_cache_key(address))
 
+    def invalidate_cords(self, lat: float, lon: float):
+        """Удаляет из кэша адрес, найденный по координатам."""
+        self.cache.delete(self._address_cache_key(lat, lon))
 
-api_2gis_service = API2GisService()
\ No newline at end of file
+
+class AsyncAPI2GisService(BaseAPI2GisService):
+    """Асинхронный 2GIS API Service с общим пулом соединений"""
+
+    def __init__(
+            self,
+            api_key: str = settings.API_2GIS_KEY,
+            timeout: float = settings.API_2GIS_TIMEOUT,
+            max_connections: int = settings.API_2GIS_MAX_CONNECTIONS,
+            max_concurrency: int = settings.API_2GIS_MAX_CONCURRENCY,
+            cache: Optional[TwoTierCache] = None,
+            route_cache: Optional[TwoTierCache] = None,
+    ):
+        super().__init__(api_key, cache, route_cache)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Лениво создает долгоживущую сессию в текущем event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> Dict:
+        session = self._get_session()
+
+        try:
+            async with self._semaphore:
+                async with session.request(method, url, **kwargs) as response:
+                    return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            raise API2GisError(
+                'Сервис карт временно недоступен. Попробуйте позже.'
+            )
+
+    async def get_cords(
+            self,
+            address: str,
+            return_data: bool = False,
+    ) -> Tuple[float, float]:
+        """Преобразует адрес в координаты (широта, долгота)."""
+        use_cache = self.cache and not return_data
+
+        if use_cache:
+            cached_cords = await self.cache.aget(self._cords_cache_key(address))
+            if cached_cords is not MISSING:
+                return tuple(cached_cords)
+
+        response_data = await self._request(
+            'GET',
+            self.geocode_url,
+            params=self._get_cords_params(address)
+        )
+        cords = self._parse_cords(response_data, address, return_data)
+
+        if use_cache:
+            await self.cache.aset(self._cords_cache_key(address), cords)
+
+        return cords
+
+    async def get_route_distance_and_duration(
+            self,
+            from_lat: float,
+            from_lon: float,
+            to_lat: float,
+            to_lon: float,
+            route_mode: RouteModeEnum = RouteModeEnum.FASTEST,
+            traffic_mode: TrafficModeEnum = TrafficModeEnum.JAM,
+            transport: TransportEnum = TransportEnum.TAXI,
+            return_data: bool = False,
+    ) -> Union[Tuple[float, float], Dict]:
+        """Рассчитывает расстояние и продолжительность пути по дорогам между двумя точками."""
+        use_cache = self.route_cache and not return_data
+
+        if use_cache:
+            cache_key, cache_ttl = self._route_cache_key_and_ttl(
+                from_lat, from_lon, to_lat, to_lon,
+                route_mode, traffic_mode, transport,
+            )
+            cached_route = await self.route_cache.aget(cache_key)
+            if cached_route is not MISSING:
+                return tuple(cached_route)
+
+        params, payload = self._get_route_request_data(
+            from_lat, from_lon, to_lat, to_lon,
+            route_mode, traffic_mode, transport,
+        )
+        response_data = await self._request(
+            'POST',
+            self.routing_url,
+            params=params,
+            json=payload,
+        )
+        route = self._parse_route(response_data, return_data)
+
+        if use_cache:
+            await self.route_cache.aset(cache_key, route, ttl=cache_ttl)
+
+        return route
+
+    async def get_address_by_cords(
+            self,
+            lat: float,
+            lon: float,
+            return_data: bool = False
+    ) -> Union[str, Dict]:
+        """Получает адрес по координатам через 2GIS API."""
+        use_cache = self.cache and not return_data
+
+        if use_cache:
+            cached_address = await self.cache.aget(
+                self._address_cache_key(lat, lon)
+            )
+            if cached_address is not MISSING:
+                return cached_address
+
+        response_data = await self._request(
+            'GET',
+            self.geocode_url,
+            params=self._get_address_params(lat, lon)
+        )
+        address = self._parse_address(response_data, return_data)
+
+        if use_cache:
+            await self.cache.aset(self._address_cache_key(lat, lon), address)
+
+        return address
+
+    async def find_match_address(
+            self,
+            address: str
+    ) -> Tuple[str, Tuple[int, int]]:
+        if self.cache:
+            cached_match = await self.cache.aget(self._match_cache_key(address))
+            if cached_match is not MISSING:
+                match_address, cords = cached_match
+                return match_address, tuple(cords)
+
+        cords = await self.get_cords(address)
+        match_address = await self.get_address_by_cords(*cords)
+
+        if self.cache:
+            await self.cache.aset(
+                self._match_cache_key(address), (match_address, cords)
+            )
+
+        return match_address, cords
+
+    async def invalidate_address(self, address: str):
+        """Удаляет из кэша результаты геокодирования адреса."""
+        await self.cache.adelete(self._cords_cache_key(address))
+        await self.cache.adelete(self._match_cache_key(address))
+
+    async def invalidate_cords(self, lat: float, lon: float):
+        """Удаляет из кэша адрес, найденный по координатам."""
+        await self.cache.adelete(self._address_cache_key(lat, lon))
+
+
+geocode_cache = TwoTierCache(
+    namespace='geocode',
+    ttl=settings.GEOCODE_CACHE_TTL,
+    local_maxsize=settings.GEOCODE_CACHE_LOCAL_SIZE,
+    local_ttl=settings.GEOCODE_CACHE_LOCAL_TTL,
+)
+route_cache = TwoTierCache(
+    namespace='route',
+    ttl=settings.ROUTE_CACHE_TTL,
+    local_maxsize=settings.ROUTE_CACHE_LOCAL_SIZE,
+)
+
+api_2gis_service = API2GisService(
+    cache=geocode_cache,
+    route_cache=route_cache,
+)
+async_api_2gis_service = AsyncAPI2GisService(
+    cache=geocode_cache,
+    route_cache=route_cache,
+)
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import redis
+from redis import asyncio as aioredis
+from loguru import logger
+
+from web.services.redis import redis_client, get_async_redis_client
+
+MISSING = object()
+
+
+class LRUCache:
+    """Потокобезопасный in-process LRU кэш с TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else 0
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache:
+    """
+    Двухуровневый кэш: in-process LRU перед общим Redis.
+
+    Значения хранятся в Redis в JSON. Ошибки Redis не пробрасываются,
+    а считаются промахом, чтобы кэш не ломал основной сценарий.
+    """
+
+    def __init__(
+            self,
+            namespace: str,
+            ttl: int,
+            local_maxsize: int = 1024,
+            local_ttl: Optional[int] = None,
+            client: redis.Redis = redis_client,
+            async_client: Optional[aioredis.Redis] = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(
+            maxsize=local_maxsize,
+            ttl=local_ttl if local_ttl is not None else ttl
+        )
+        self.client = client
+        self._async_client = async_client
+        self.stats = {
+            'local_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+        }
+
+    @property
+    def async_client(self) -> aioredis.Redis:
+        return self._async_client or get_async_redis_client()
+
+    def make_key(self, key: str) -> str:
+        return f'{self.namespace}:{key}'
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self.stats)
+        stats['local_size'] = len(self.local)
+        return stats
+
+    def _from_redis(self, key: str, raw_value: Optional[str]) -> Any:
+        if raw_value is None:
+            self.stats['misses'] += 1
+            return MISSING
+
+        value = json.loads(raw_value)
+        self.stats['redis_hits'] += 1
+        self.local.set(key, value)
+        return value
+
+    def _from_local(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not MISSING:
+            self.stats['local_hits'] += 1
+
+        return value
+
+    def get(self, key: str) -> Any:
+        value = self._from_local(key)
+        if value is not MISSING:
+            return value
+
+        try:
+            raw_value = self.client.get(self.make_key(key))
+        except redis.RedisError as e:
+            logger.warning(f'Cache {self.namespace}: redis get failed: {e}')
+            raw_value = None
+
+        return self._from_redis(key, raw_value)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = ttl or self.ttl
+        self.local.set(key, value, ttl=min(ttl, self.local.ttl or ttl))
+
+        try:
+            self.client.set(self.make_key(key), json.dumps(value), ex=ttl)
+        except redis.RedisError as e:
+            logger.warning(f'Cache {self.namespace}: redis set failed: {e}')
+
+    def delete(self, key: str):
+        self.local.delete(key)
+
+        try:
+            self.client.delete(self.make_key(key))
+        except redis.RedisError as e:
+            logger.warning(f'Cache {self.namespace}: redis delete failed: {e}')
+
+    async def aget(self, key: str) -> Any:
+        value = self._from_local(key)
+        if value is not MISSING:
+            return value
+
+        try:
+            raw_value = await self.async_client.get(self.make_key(key))
+        except redis.RedisError as e:
+            logger.warning(f'Cache {self.namespace}: redis get failed: {e}')
+            raw_value = None
+
+        return self._from_redis(key, raw_value)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = ttl or self.ttl
+        self.local.set(key, value, ttl=min(ttl, self.local.ttl or ttl))
+
+        try:
+            await self.async_client.set(
+                self.make_key(key), json.dumps(value), ex=ttl
+            )
+        except redis.RedisError as e:
+            logger.warning(f'Cache {self.namespace}: redis set failed: {e}')
+
+    async def adelete(self, key: str):
+        self.local.delete(key)
+
+        try:
+            await self.async_client.delete(self.make_key(key))
+        except redis.RedisError as e:
+            logger.warning(f'Cache {self.namespace}: redis delete failed: {e}')
@@ -0,0 +1,195 @@
+import time
+from typing import List, Tuple
+
+import redis
+from loguru import logger
+
+from django.conf import settings
+
+from web.services.redis import redis_client, get_async_redis_client, get_async_script
+
+
+# Обновляет геопозицию водителя и удаляет из обоих наборов
+# водителей, не обновлявших геопозицию дольше ttl
+UPDATE_SCRIPT = '''
+local now = tonumber(ARGV[4])
+redis.call('GEOADD', KEYS[1], ARGV[1], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[2], now, ARGV[3])
+
+local expired = redis.call(
+    'ZRANGEBYSCORE', KEYS[2], '-inf', now - tonumber(ARGV[5]),
+    'LIMIT', 0, tonumber(ARGV[6])
+)
+if #expired > 0 then
+    redis.call('ZREM', KEYS[1], unpack(expired))
+    redis.call('ZREM', KEYS[2], unpack(expired))
+end
+return #expired
+'''
+
+# Ищет водителей в радиусе и проверяет свежесть только найденных
+# через ZMSCORE. Возвращает плоский список id, расстояние, ...
+SEARCH_SCRIPT = '''
+local drivers = redis.call(
+    'GEOSEARCH', KEYS[1], 'FROMLONLAT', ARGV[1], ARGV[2],
+    'BYRADIUS', ARGV[3], 'km', 'ASC', 'WITHDIST'
+)
+local min_updated_at = tonumber(ARGV[4])
+local count = tonumber(ARGV[5])
+local result = {}
+local found = 0
+local batch_size = 500
+
+for i = 1, #drivers, batch_size do
+    local ids = {}
+    for j = i, math.min(i + batch_size - 1, #drivers) do
+        ids[#ids + 1] = drivers[j][1]
+    end
+
+    local updated_at = redis.call('ZMSCORE', KEYS[2], unpack(ids))
+    for j = 1, #ids do
+        if updated_at[j] and tonumber(updated_at[j]) >= min_updated_at then
+            local driver = drivers[i + j - 1]
+            result[#result + 1] = driver[1]
+            result[#result + 1] = driver[2]
+            found = found + 1
+            if count > 0 and found >= count then
+                return result
+            end
+        end
+    end
+end
+return result
+'''
+
+
+class DriverLocationIndex:
+    """
+    Пространственный индекс местоположений водителей в Redis.
+
+    Координаты хранятся в GEO-наборе (sorted set с geohash в качестве score),
+    время последнего обновления - в отдельном sorted set.
+    Водители, не обновлявшие геопозицию дольше ttl, в поиск не попадают
+    и постепенно удаляются из обоих наборов при обновлениях.
+    """
+
+    def __init__(
+            self,
+            key: str = 'drivers:locations',
+            ttl: int = settings.DRIVER_LOCATION_TTL,
+            client: redis.Redis = redis_client,
+            prune_limit: int = 100,
+    ):
+        self.key = key
+        self.updated_at_key = f'{key}:updated_at'
+        self.ttl = ttl
+        self.client = client
+        self.prune_limit = prune_limit
+        self._update_script = client.register_script(UPDATE_SCRIPT)
+        self._search_script = client.register_script(SEARCH_SCRIPT)
+
+    def _update_args(self, telegram_id: int, lat: float, lon: float) -> dict:
+        return {
+            'keys': [self.key, self.updated_at_key],
+            'args': [lon, lat, telegram_id, time.time(), self.ttl, self.prune_limit],
+        }
+
+    def _search_args(
+            self,
+            lat: float,
+            lon: float,
+            radius_km: float,
+            count: int | None,
+    ) -> dict:
+        return {
+            'keys': [self.key, self.updated_at_key],
+            'args': [lon, lat, radius_km, time.time() - self.ttl, count or 0],
+        }
+
+    def _remove_commands(self, pipe, *telegram_ids: int):
+        pipe.zrem(self.key, *telegram_ids)
+        pipe.zrem(self.updated_at_key, *telegram_ids)
+
+    @staticmethod
+    def _parse_search(result) -> List[Tuple[int, float]]:
+        return [
+            (int(telegram_id), float(distance))
+            for telegram_id, distance in zip(result[::2], result[1::2])
+        ]
+
+    def update(self, telegram_id: int, lat: float, lon: float):
+        self._update_script(**self._update_args(telegram_id, lat, lon))
+
+    async def aupdate(self, telegram_id: int, lat: float, lon: float):
+        script = get_async_script(UPDATE_SCRIPT)
+        await script(**self._update_args(telegram_id, lat, lon))
+
+    def remove(self, *telegram_ids: int):
+        pipe = self.client.pipeline()
+        self._remove_commands(pipe, *telegram_ids)
+        pipe.execute()
+
+    async def aremove(self, *telegram_ids: int):
+        pipe = get_async_redis_client().pipeline()
+        self._remove_commands(pipe, *telegram_ids)
+        await pipe.execute()
+
+    def search(
+            self,
+            lat: float,
+            lon: float,
+            radius_km: float = settings.DRIVER_SEARCH_RADIUS_KM,
+            count: int | None = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Возвращает список (telegram_id, расстояние в км) водителей
+        в радиусе radius_km, отсортированный по удаленности.
+        """
+        try:
+            return self._parse_search(
+                self._search_script(
+                    **self._search_args(lat, lon, radius_km, count)
+                )
+            )
+        except redis.RedisError as e:
+            logger.warning(f'Driver location index is unavailable: {e}')
+            return []
+
+    async def asearch(
+            self,
+            lat: float,
+            lon: float,
+            radius_km: float = settings.DRIVER_SEARCH_RADIUS_KM,
+            count: int | None = None,
+    ) -> List[Tuple[int, float]]:
+        script = get_async_script(SEARCH_SCRIPT)
+
+        try:
+            return self._parse_search(
+                await script(**self._search_args(lat, lon, radius_km, count))
+            )
+        except redis.RedisError as e:
+            logger.warning(f'Driver location index is unavailable: {e}')
+            return []
+
+    def nearest(
+            self,
+            lat: float,
+            lon: float,
+            count: int = settings.DRIVER_SEARCH_LIMIT,
+            radius_km: float = settings.DRIVER_SEARCH_RADIUS_KM,
+    ) -> List[Tuple[int, float]]:
+        """Возвращает count ближайших водителей в радиусе radius_km."""
+        return self.search(lat, lon, radius_km=radius_km, count=count)
+
+    async def anearest(
+            self,
+            lat: float,
+            lon: float,
+            count: int = settings.DRIVER_SEARCH_LIMIT,
+            radius_km: float = settings.DRIVER_SEARCH_RADIUS_KM,
+    ) -> List[Tuple[int, float]]:
+        return await self.asearch(lat, lon, radius_km=radius_km, count=count)
+
+
+driver_location_index = DriverLocationIndex()
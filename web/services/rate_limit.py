@@ -0,0 +1,179 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+
+import redis
+from loguru import logger
+
+from django.conf import settings
+
+from web.services.redis import redis_client, get_async_script
+
+
+class Priority(IntEnum):
+    HIGH = 0 # Предложения заказов водителям
+    NORMAL = 1
+    LOW = 2 # Запросы оценок и прочие необязательные сообщения
+
+
+# Доля емкости корзины, которую приоритет не может израсходовать.
+# Остаток резервируется под более важные сообщения.
+PRIORITY_RESERVE = {
+    Priority.HIGH: 0.0,
+    Priority.NORMAL: 0.2,
+    Priority.LOW: 0.5,
+}
+
+# Token bucket. Возвращает 0, если токен выдан,
+# иначе количество секунд до появления токена.
+TOKEN_BUCKET_SCRIPT = '''
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[3])
+
+local redis_time = redis.call('TIME')
+local now = tonumber(redis_time[1]) + tonumber(redis_time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens - 1 >= reserve then
+    tokens = tokens - 1
+else
+    wait = (1 + reserve - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+
+return tostring(wait)
+'''
+
+telegram_priority: ContextVar[Priority] = ContextVar(
+    'telegram_priority',
+    default=Priority.NORMAL
+)
+
+
+@contextmanager
+def use_telegram_priority(priority: Priority):
+    """Задает приоритет запросов к Telegram внутри блока."""
+    token = telegram_priority.set(priority)
+    try:
+        yield
+    finally:
+        telegram_priority.reset(token)
+
+
+class TokenBucket:
+    """Распределенный token bucket в Redis"""
+
+    def __init__(
+            self,
+            key: str,
+            capacity: float,
+            rate: float,
+            reserves: dict[Priority, float] | None = None,
+            client: redis.Redis = redis_client,
+    ):
+        self.key = key
+        self.capacity = capacity
+        self.rate = rate
+        self.reserves = reserves or {}
+        self.client = client
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def _args(self, priority: Priority):
+        reserve = self.capacity * self.reserves.get(priority, 0)
+        return [self.capacity, self.rate, reserve]
+
+    def try_acquire(self, priority: Priority = Priority.NORMAL) -> float:
+        """Возвращает 0, если токен получен, иначе время ожидания в секундах."""
+        try:
+            return float(self._script(keys=[self.key], args=self._args(priority)))
+        except redis.RedisError as e:
+            logger.warning(f'Rate limiter {self.key} is unavailable: {e}')
+            return 0
+
+    async def atry_acquire(self, priority: Priority = Priority.NORMAL) -> float:
+        script = get_async_script(TOKEN_BUCKET_SCRIPT)
+
+        try:
+            return float(
+                await script(keys=[self.key], args=self._args(priority))
+            )
+        except redis.RedisError as e:
+            logger.warning(f'Rate limiter {self.key} is unavailable: {e}')
+            return 0
+
+    def acquire(self, priority: Priority = Priority.NORMAL):
+        while wait := self.try_acquire(priority):
+            time.sleep(wait)
+
+    async def aacquire(self, priority: Priority = Priority.NORMAL):
+        while wait := await self.atry_acquire(priority):
+            await asyncio.sleep(wait)
+
+
+class TelegramRateLimiter:
+    """
+    Общий для бота и Celery ограничитель отправки сообщений в Telegram.
+
+    Использует глобальную корзину на бота и отдельную корзину на каждый чат.
+    Приоритет учитывается только в глобальной корзине.
+    """
+
+    def __init__(
+            self,
+            global_rate: int = settings.TELEGRAM_GLOBAL_RATE_LIMIT,
+            chat_rate: int = settings.TELEGRAM_CHAT_RATE_LIMIT,
+            chat_burst: int = settings.TELEGRAM_CHAT_BURST,
+            group_rate_per_minute: int = settings.TELEGRAM_GROUP_RATE_PER_MINUTE,
+            client: redis.Redis = redis_client,
+    ):
+        self.global_bucket = TokenBucket(
+            key='telegram:rate:global',
+            capacity=global_rate,
+            rate=global_rate,
+            reserves=PRIORITY_RESERVE,
+            client=client,
+        )
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate_per_minute = group_rate_per_minute
+        self.client = client
+
+    def get_chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        # Отрицательные id у групп и каналов, для них лимит в минуту
+        if str(chat_id).startswith('-'):
+            capacity = self.group_rate_per_minute
+            rate = self.group_rate_per_minute / 60
+        else:
+            # Запас корзины позволяет ответить несколькими сообщениями подряд
+            capacity = max(self.chat_burst, self.chat_rate)
+            rate = self.chat_rate
+
+        return TokenBucket(
+            key=f'telegram:rate:chat:{chat_id}',
+            capacity=capacity,
+            rate=rate,
+            client=self.client,
+        )
+
+    def acquire(self, chat_id: int | str, priority: Priority | None = None):
+        priority = telegram_priority.get() if priority is None else priority
+        self.get_chat_bucket(chat_id).acquire(priority)
+        self.global_bucket.acquire(priority)
+
+    async def aacquire(self, chat_id: int | str, priority: Priority | None = None):
+        priority = telegram_priority.get() if priority is None else priority
+        await self.get_chat_bucket(chat_id).aacquire(priority)
+        await self.global_bucket.aacquire(priority)
+
+
+telegram_rate_limiter = TelegramRateLimiter()
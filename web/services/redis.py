@@ -0,0 +1,50 @@
+import asyncio
+from weakref import WeakKeyDictionary
+
+import redis
+from redis import asyncio as aioredis
+
+from django.conf import settings
+
+
+redis_client = redis.Redis.from_url(
+    settings.REDIS_CACHE_URL,
+    decode_responses=True,
+)
+
+_async_redis_clients: WeakKeyDictionary = WeakKeyDictionary()
+_async_scripts: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def get_async_redis_client() -> aioredis.Redis:
+    """
+    Возвращает асинхронный клиент Redis для текущего event loop.
+
+    Соединения redis.asyncio привязаны к loop, в котором созданы,
+    а Celery задачи запускают корутины в собственных loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+
+    if client is None:
+        client = aioredis.Redis.from_url(
+            settings.REDIS_CACHE_URL,
+            decode_responses=True,
+        )
+        _async_redis_clients[loop] = client
+
+    return client
+
+
+def get_async_script(script: str):
+    """
+    Возвращает Lua скрипт, зарегистрированный в асинхронном клиенте
+    текущего event loop. Скрипт вызывается через EVALSHA.
+    """
+    client = get_async_redis_client()
+    scripts = _async_scripts.setdefault(client, {})
+
+    if script not in scripts:
+        scripts[script] = client.register_script(script)
+
+    return scripts[script]
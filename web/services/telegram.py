@@ -1,9 +1,23 @@
+import asyncio
 import json
+import tempfile
+import time
+from typing import BinaryIO, Dict, Iterable, Optional
 
 import aiohttp
 import requests
+from loguru import logger
 
 from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+
+from web.services.rate_limit import Priority, telegram_rate_limiter
+
+
+def get_retry_after(response_data: dict) -> int:
+    """Возвращает retry_after из ответа Telegram с кодом 429."""
+    return int(response_data.get('parameters', {}).get('retry_after', 1))
 
 
 class TelegramService:
@@ -22,6 +36,7 @@ class TelegramService:
             text: str,
             reply_markup: dict[str, list] | None = None,
             parse_mode: str = 'HTML',
+            priority: Priority | None = None,
     ):
         payload = {
             'chat_id': chat_id,
@@ -32,23 +47,116 @@ class TelegramService:
         if reply_markup:
             payload['reply_markup'] = json.dumps(reply_markup)
 
-        response = requests.post(
-            url=f'{self.__bot_api_url}/sendMessage',
-            json=payload,
-        )
+        for attempt in range(settings.TELEGRAM_MAX_RETRIES + 1):
+            telegram_rate_limiter.acquire(chat_id, priority)
+            response = requests.post(
+                url=f'{self.__bot_api_url}/sendMessage',
+                json=payload,
+            )
+
+            if response.status_code != 429 or attempt == settings.TELEGRAM_MAX_RETRIES:
+                break
+
+            retry_after = get_retry_after(response.json())
+            logger.warning(f'Telegram 429 for chat {chat_id}, retry after {retry_after}s')
+            time.sleep(retry_after)
+
+        if response.status_code != 200:
+            logger.error(
+                f'Failed to send message to {chat_id}: '
+                f'{response.status_code} {response.text}'
+            )
 
         return response
 
+    def get_file_path_by_file_id(self, file_id: str) -> str:
+        response = requests.get(
+            url=f'{self.__bot_api_url}/getFile',
+            params={'file_id': file_id},
+            timeout=settings.TELEGRAM_TIMEOUT,
+        )
+
+        if response.status_code != 200:
+            raise Exception(f'Ошибка при получении file_path: {response.status_code}')
+
+        return response.json()['result']['file_path']
+
+    def download_file(
+            self,
+            file_id: str,
+            file: BinaryIO,
+            chunk_size: int = settings.TELEGRAM_DOWNLOAD_CHUNK_SIZE,
+    ) -> int:
+        """Потоково скачивает файл Telegram в открытый файл. Возвращает размер."""
+        file_path = self.get_file_path_by_file_id(file_id)
+        file_url = f'{self.api_url}/file/bot{self.__bot_token}/{file_path}'
+        size = 0
+
+        with requests.get(
+            file_url,
+            stream=True,
+            timeout=settings.TELEGRAM_TIMEOUT,
+        ) as response:
+            if response.status_code != 200:
+                raise Exception(f'Ошибка при скачивании файла: {response.status_code}')
+
+            for chunk in response.iter_content(chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+
+        return size
+
 
 class AsyncTelegramService:
     def __init__(
             self,
             bot_token: str = settings.BOT_TOKEN,
-            api_url: str = settings.TELEGRAM_API_URL
+            api_url: str = settings.TELEGRAM_API_URL,
+            max_connections: int = settings.TELEGRAM_MAX_CONNECTIONS,
+            keepalive_timeout: float = settings.TELEGRAM_KEEPALIVE_TIMEOUT,
+            timeout: float = settings.TELEGRAM_TIMEOUT,
     ):
         self.__bot_token = bot_token
         self.api_url = api_url
         self.__bot_api_url = f'{api_url}/bot{bot_token}'
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Лениво создает общую сессию с пулом соединений в текущем event loop."""
+        loop = asyncio.get_running_loop()
+
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+            )
+            self._session_loop = loop
+
+        return self._session
+
+    async def startup(self):
+        """Создает сессию заранее, чтобы первый запрос не платил за нее."""
+        self._get_session()
+
+    async def shutdown(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
+        self._session_loop = None
 
     async def send_message(
             self,
@@ -56,6 +164,7 @@ class AsyncTelegramService:
             text: str,
             reply_markup: dict[str, list] | None = None,
             parse_mode: str = 'HTML',
+            priority: Priority | None = None,
     ) -> int:
         url = f'{self.__bot_api_url}/sendMessage'
         payload = {
@@ -67,36 +176,119 @@ class AsyncTelegramService:
         if reply_markup:
             payload['reply_markup'] = json.dumps(reply_markup)
 
-        async with aiohttp.ClientSession() as session:
+        session = self._get_session()
+
+        for attempt in range(settings.TELEGRAM_MAX_RETRIES + 1):
+            await telegram_rate_limiter.aacquire(chat_id, priority)
+
             async with session.post(url, data=payload) as response:
-                return response.status
+                status = response.status
+                response_data = await response.json(content_type=None)
+
+            if status != 429 or attempt == settings.TELEGRAM_MAX_RETRIES:
+                break
+
+            retry_after = get_retry_after(response_data)
+            logger.warning(f'Telegram 429 for chat {chat_id}, retry after {retry_after}s')
+            await asyncio.sleep(retry_after)
+
+        if status != 200:
+            logger.error(f'Failed to send message to {chat_id}: {status} {response_data}')
+
+        return status
+
+    async def broadcast_message(
+            self,
+            chat_ids: Iterable[int],
+            text: str,
+            reply_markup: dict[str, list] | None = None,
+            parse_mode: str = 'HTML',
+            priority: Priority | None = None,
+            max_concurrency: int = settings.TELEGRAM_BROADCAST_CONCURRENCY,
+    ) -> Dict[int, Optional[int]]:
+        """
+        Рассылает сообщение в несколько чатов через общую сессию.
+
+        Параллельность ограничена семафором, частота отправки -
+        общим с ботом ограничителем Telegram.
+        Возвращает статус ответа для каждого чата (None при ошибке сети).
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def send(chat_id: int):
+            async with semaphore:
+                try:
+                    return await self.send_message(
+                        chat_id, text, reply_markup, parse_mode, priority
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.warning(f'Failed to send message to {chat_id}: {e}')
+                    return None
+
+        chat_ids = list(chat_ids)
+        statuses = await asyncio.gather(
+            *(send(chat_id) for chat_id in chat_ids)
+        )
+
+        return dict(zip(chat_ids, statuses))
 
     async def get_file_path_by_file_id(self, file_id: str):
         url = f'{self.__bot_api_url}/getFile'
         params = {"file_id": file_id}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
+        async with self._get_session().get(url, params=params) as response:
 
-                if response.status == 200:
-                    file_path = (await response.json())['result']['file_path']
-                    return file_path
-                else:
-                    raise Exception(f'Ошибка при получении file_path: {response.status}')
+            if response.status == 200:
+                file_path = (await response.json())['result']['file_path']
+                return file_path
+            else:
+                raise Exception(f'Ошибка при получении file_path: {response.status}')
 
-    async def save_file(self, file_id: str, save_path: str) -> int:
+    async def download_file(
+            self,
+            file_id: str,
+            file: BinaryIO,
+            chunk_size: int = settings.TELEGRAM_DOWNLOAD_CHUNK_SIZE,
+    ) -> int:
+        """Потоково скачивает файл Telegram в открытый файл. Возвращает размер."""
         file_path = await self.get_file_path_by_file_id(file_id)
         file_url = f'{self.api_url}/file/bot{self.__bot_token}/{file_path}'
+        size = 0
+
+        async with self._get_session().get(file_url) as response:
+            if response.status != 200:
+                raise Exception(f'Ошибка при скачивании файла: {response.status}')
+
+            async for chunk in response.content.iter_chunked(chunk_size):
+                await asyncio.to_thread(file.write, chunk)
+                size += len(chunk)
+
+        return size
+
+    async def save_file(
+            self,
+            file_id: str,
+            save_path: str,
+            storage: Storage = default_storage,
+    ) -> str:
+        """
+        Сохраняет файл Telegram в хранилище Django.
+
+        Файл скачивается частями во временный файл с уникальным именем,
+        запись на диск и в хранилище выполняется вне event loop.
+        Возвращает имя, под которым файл сохранен в хранилище.
+        """
+        temp_file = await asyncio.to_thread(tempfile.TemporaryFile)
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_url) as response:
-                if response.status == 200:
-                    with open(save_path, 'wb') as file:
-                        file.write(await response.read())
-                else:
-                    raise Exception(f"Ошибка при скачивании файла: {response.status}")
+        try:
+            await self.download_file(file_id, temp_file)
+            await asyncio.to_thread(temp_file.seek, 0)
 
-                return response.status
+            return await asyncio.to_thread(
+                storage.save, save_path, File(temp_file)
+            )
+        finally:
+            await asyncio.to_thread(temp_file.close)
 
 
 telegram_service = TelegramService()
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Callable
+
+from django.conf import settings
+from PIL import Image
+
+from web.services.telegram import TelegramService, telegram_service
+
+
+class TelegramMediaCache:
+    """
+    Ограниченный по размеру дисковый кэш файлов Telegram.
+
+    Файл скачивается по file_id при первом обращении, превью строится
+    из скачанного оригинала. Когда кэш превышает max_size байт,
+    удаляются файлы, к которым дольше всего не обращались.
+    """
+    ORIGINALS_DIR = 'originals'
+    THUMBNAILS_DIR = 'thumbnails'
+
+    def __init__(
+            self,
+            root: str = settings.TELEGRAM_MEDIA_CACHE_DIR,
+            max_size: int = settings.TELEGRAM_MEDIA_CACHE_MAX_SIZE,
+            thumbnail_size: int = settings.TELEGRAM_MEDIA_THUMBNAIL_SIZE,
+            service: TelegramService = telegram_service,
+    ):
+        self.root = root
+        self.max_size = max_size
+        self.thumbnail_size = (thumbnail_size, thumbnail_size)
+        self.service = service
+        self._evict_lock = threading.Lock()
+
+    def _path(self, directory: str, file_id: str) -> str:
+        # file_id может содержать символы, недопустимые в имени файла
+        name = hashlib.sha256(file_id.encode()).hexdigest()
+        return os.path.join(self.root, directory, f'{name}.jpg')
+
+    @staticmethod
+    def _open_cached(path: str) -> BinaryIO | None:
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        # Время изменения служит временем последнего обращения для вытеснения
+        os.utime(path)
+        return file
+
+    @staticmethod
+    def _write(path: str, write: Callable[[BinaryIO], None]):
+        """Пишет файл через уникальный временный файл и атомарный rename."""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                write(file)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _save_thumbnail(self, original: BinaryIO, file: BinaryIO):
+        with Image.open(original) as image:
+            image.thumbnail(self.thumbnail_size)
+            image.convert('RGB').save(file, format='JPEG', quality=85)
+
+    def open_original(self, file_id: str) -> BinaryIO:
+        """Возвращает открытый файл, при промахе скачивает его из Telegram."""
+        path = self._path(self.ORIGINALS_DIR, file_id)
+        if (file := self._open_cached(path)) is not None:
+            return file
+
+        self._write(path, lambda file: self.service.download_file(file_id, file))
+        # Файл открывается до вытеснения, чтобы его нельзя было удалить до ответа
+        file = open(path, 'rb')
+        self.evict()
+
+        return file
+
+    def open_thumbnail(self, file_id: str) -> BinaryIO:
+        """Возвращает открытое превью, при промахе строит его из оригинала."""
+        path = self._path(self.THUMBNAILS_DIR, file_id)
+        if (file := self._open_cached(path)) is not None:
+            return file
+
+        with self.open_original(file_id) as original:
+            self._write(path, lambda file: self._save_thumbnail(original, file))
+
+        file = open(path, 'rb')
+        self.evict()
+
+        return file
+
+    def evict(self):
+        """Удаляет давно не использованные файлы, пока кэш больше max_size."""
+        with self._evict_lock:
+            files = []
+            for directory in (self.ORIGINALS_DIR, self.THUMBNAILS_DIR):
+                directory = os.path.join(self.root, directory)
+                if not os.path.isdir(directory):
+                    continue
+
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.tmp'):
+                            continue
+
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total_size = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total_size <= self.max_size:
+                    break
+
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+                total_size -= size
+
+
+telegram_media_cache = TelegramMediaCache()
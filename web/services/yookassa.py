@@ -1,13 +1,56 @@
-import uuid
+import time
 from typing import Optional
 
-from yookassa import Payment as YookassaPayment
+import requests
+from loguru import logger
+from yookassa import Payment as YookassaPayment, Refund as YookassaRefund
 from django.conf import settings
-from yookassa.domain.exceptions import BadRequestError
-from yookassa.domain.response import PaymentResponse
+from yookassa.domain.exceptions import (
+    BadRequestError,
+    InternalServerError,
+    ResponseProcessingError,
+    TooManyRequestsError,
+)
+from yookassa.domain.response import PaymentResponse, RefundResponse
 
 from web.apps.orders.models import Payment
 
+# Ошибки, после которых запрос можно безопасно повторить с тем же ключом
+RETRYABLE_ERRORS = (
+    requests.RequestException,
+    InternalServerError,
+    ResponseProcessingError,
+    TooManyRequestsError,
+)
+
+
+def get_idempotence_key(db_payment_id: Payment.id, variant: str) -> str:
+    """
+    Ключ идемпотентности зависит только от платежа и тела запроса,
+    поэтому повтор после таймаута не создаст второй платеж в YooKassa.
+    """
+    return f'payment-{db_payment_id}-{variant}'
+
+
+def create_with_retries(
+    payment_data: dict,
+    idempotence_key: str,
+    max_retries: int = settings.YOOKASSA_MAX_RETRIES,
+) -> PaymentResponse:
+    for attempt in range(max_retries + 1):
+        try:
+            return YookassaPayment.create(payment_data, idempotence_key)
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+
+            delay = 0.5 * 2 ** attempt
+            logger.warning(
+                f'YooKassa payment {idempotence_key} failed: {e!r}, '
+                f'retry in {delay}s'
+            )
+            time.sleep(delay)
+
 
 def create_yookassa_payment(
     db_payment_id: Payment.id,
@@ -16,7 +59,6 @@ def create_yookassa_payment(
     description: Optional[str] = None,
     payment_type: str = 'sbp',
 ) -> PaymentResponse:
-    idempotence_key = str(uuid.uuid4())
     payment_data = {
         'amount': {
             'value': f'{amount:.2f}',
@@ -34,10 +76,37 @@ def create_yookassa_payment(
         'metadata': metadata
     }
     try:
-        payment = YookassaPayment.create(payment_data, idempotence_key)
+        payment = create_with_retries(
+            payment_data,
+            get_idempotence_key(db_payment_id, payment_type),
+        )
     except BadRequestError:
+        # Тело запроса меняется, поэтому нужен другой ключ
         payment_data.pop('payment_method_data')
-        idempotence_key = str(uuid.uuid4())
-        payment = YookassaPayment.create(payment_data, idempotence_key)
+        payment = create_with_retries(
+            payment_data,
+            get_idempotence_key(db_payment_id, 'any'),
+        )
 
     return payment
+
+
+def create_yookassa_refund(
+    db_payment_id: Payment.id,
+    yookassa_payment_id: str,
+    amount: float,
+    description: Optional[str] = None,
+) -> RefundResponse:
+    """Возвращает покупателю полную сумму платежа"""
+    refund_data = {
+        'payment_id': yookassa_payment_id,
+        'amount': {
+            'value': f'{amount:.2f}',
+            'currency': 'RUB'
+        },
+        'description': description,
+    }
+    return YookassaRefund.create(
+        refund_data,
+        get_idempotence_key(db_payment_id, 'refund'),
+    )
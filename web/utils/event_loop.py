@@ -0,0 +1,65 @@
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundEventLoop:
+    """
+    Event loop в отдельном потоке для запуска корутин из синхронного кода.
+
+    В отличие от asyncio.run loop живет между вызовами, поэтому
+    сессии и пулы соединений асинхронных сервисов переиспользуются.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return (
+            self._thread is not None
+            and self._thread.is_alive()
+            and self._pid == os.getpid() # После fork поток не наследуется
+        )
+
+    def start(self):
+        with self._lock:
+            if self.is_running:
+                return
+
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever,
+                name='background-event-loop',
+                daemon=True,
+            )
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout)
+
+    def stop(self):
+        with self._lock:
+            if not self.is_running:
+                return
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+background_loop = BackgroundEventLoop()
+
+
+def run_async(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Выполняет корутину в фоновом event loop процесса и возвращает результат."""
+    return background_loop.run(coro, timeout)
@@ -0,0 +1,33 @@
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(lat: float, lon: float, precision: int = 7) -> str:
+    """Кодирует координаты в geohash заданной длины."""
+    lat_interval = [-90.0, 90.0]
+    lon_interval = [-180.0, 180.0]
+    geohash = []
+    bits = [16, 8, 4, 2, 1]
+    bit = 0
+    char_index = 0
+    even = True
+
+    while len(geohash) < precision:
+        interval, value = (lon_interval, lon) if even else (lat_interval, lat)
+        middle = (interval[0] + interval[1]) / 2
+
+        if value > middle:
+            char_index |= bits[bit]
+            interval[0] = middle
+        else:
+            interval[1] = middle
+
+        even = not even
+        if bit < 4:
+            bit += 1
+        else:
+            geohash.append(GEOHASH_ALPHABET[char_index])
+            bit = 0
+            char_index = 0
+
+    return ''.join(geohash)
+
@@ -0,0 +1,70 @@
+import math
+from typing import Sequence, List
+
+from django.db.models import QuerySet
+
+
+class Paginator:
+    def __init__(
+        self,
+        array: Sequence,
+        page_number: int = 1,
+        per_page: int = 1,
+    ):
+        self.array = array
+        self.page_number = page_number
+        self.per_page = per_page
+        self.pages = math.ceil(len(self.array) / self.per_page)
+
+    def get_page(self):
+        begin = (self.page_number - 1) * self.per_page
+        end = begin + self.per_page
+        return self.array[begin: end]
+
+    def has_next(self):
+        return self.page_number < self.pages
+
+    def has_previous(self):
+        return self.page_number > 1
+
+
+class QuerySetPaginator:
+    """
+    Пагинатор queryset, загружающий из БД только одну страницу.
+
+    Страница выбирается через LIMIT/OFFSET с одной лишней строкой,
+    по которой определяется наличие следующей страницы без COUNT(*).
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        page_number: int = 1,
+        per_page: int = 1,
+    ):
+        self.queryset = queryset
+        self.page_number = max(page_number, 1)
+        self.per_page = per_page
+        self.page: List = []
+        self._has_next = False
+
+    async def aload(self) -> List:
+        begin = (self.page_number - 1) * self.per_page
+        end = begin + self.per_page + 1
+        objs = [obj async for obj in self.queryset[begin: end]]
+        self.set_page(objs[:self.per_page], len(objs) > self.per_page)
+
+        return self.page
+
+    def set_page(self, page: List, has_next: bool):
+        self.page = page
+        self._has_next = has_next
+
+    def get_page(self):
+        return self.page
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.page_number > 1